@@ -8,6 +8,20 @@ __version__ = '1.0'
 
 import optparse, os, sys
 import re
+import itertools
+import collections
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# requires WWN.py from this repository
+import WWN
+
+# aliases are read ahead this many lines at a time, at most readahead blocks per file
+aliasblocksize = 10000
+readahead = 4
+# aliases are matched in runs of this many, spread across processes with --processes
+aliasrunsize = 50000
 
 devicetypewwns = [('20:?00:?00:?25:?b5.*', 'Host'), # Cisco UCS
                   ('2[0-9a-fA-F]:?[0-9a-fA-F][0-9a-fA-F]:?00:?2a:?6a.*', 'Host'), # Cisco UCS
@@ -44,8 +58,17 @@ def ParseCmdLineParameters():
     opts.add_option("-w", "--hostwwns", action="store", type="string", dest="hostwwns")
     opts.add_option("-r", "--regex", action="store", type="string", dest="regex")
     opts.add_option("-z", "--strip", action="store", type="string", dest="strip")
+    opts.add_option("-j", "--processes", action="store", type="int", dest="processes", default=1)
     opt, argv = opts.parse_args()
 
+    if opt.processes < 1:
+        PrintHelpAndExit("Number of processes must be at least 1.")
+
+    if opt.input != None:
+        for inputfile in opt.input.split(','):
+            if not os.path.exists(inputfile):
+                PrintHelpAndExit("Specified alias file {0} does not exist.".format(inputfile))
+
     if opt.hostwwns != None:
         a = opt.hostwwns.split(',')
         a.reverse()
@@ -67,22 +90,77 @@ def ParseCmdLineParameters():
 def PrintHelpAndExit(errormessage=""):
     if (errormessage != ""):
         print("\n\n" + errormessage)
-    print("\n\nUsage:\n\tAliasesToEntities.py [-i <aliases.csv>][,<aliases.csv>] [-o <output.csv>] [-s <storagewwnpattern>] [-w <hostwwnpattern>] [-r <regex pattern>] [-z <skip string>]\n\n")
-    print("\tIf -i is not specified, aliases will be read from stdin.\n")
+    print("\n\nUsage:\n\tAliasesToEntities.py [-i <aliases.csv>][,<aliases.csv>] [-o <output.csv>] [-s <storagewwnpattern>] [-w <hostwwnpattern>] [-r <regex pattern>] [-z <skip string>] [-j <processes>]\n\n")
+    print("\tIf -i is not specified, aliases will be read from stdin.  Aliases or WWNs that differ between input files are reported, the later file wins.\n")
     print("\tIf -o is not specified, output will go to stdout.\n")
     print("\tstorageportwwnpatterns and hostwwnpatterns can be used to override the default host or storage assignment and should be specified one or more comma separated, in regex pattern (-s 50.*,60.*,70.*)\n")
     print("\tregex patterns should be specified comma separated (-r ""^(.*)_hba\d+$""\n")
+    print("\t--processes splits the aliases across that many processes, for very large alias files\n")
     print("\t--strip allows you to remove strings anywhere in the alias, for example SANA_HOSTNAME_HBA you could specify -z SANA_,SANB_ to strip off the beginning part\n")
     print("\n\tExample: python3 AliasesToEntities.py -i alias_a.csv,alias_b.csv -o output.csv -z DC1_ -r ""^(.*?)_.*$""\n")
 
     exit()
 
 def ReadAliases(fh):
-    aliasesdict = {}
-    for line in fh.readlines():
-        aliasesdict[line.split(',')[1].strip()] = line.split(',')[0]
+    return dict(IterAliases(fh))
+
+# yields (alias, wwn) for each wwn,alias line as it is read
+def IterAliases(fh):
+    for line in fh:
+        fields = line.split(',', 2)
+        yield (fields[1].strip(), fields[0])
+
+# reads each file on its own thread, a bounded number of blocks ahead of the reader, and yields
+# their (alias, wwn) pairs in file order, reporting aliases or wwns that one file gives
+# differently from an earlier one to stderr, the later file wins as it did when merging dicts
+def IterAliasFiles(filenames):
+    def ReadAhead(filename, blocks):
+        try:
+            with open(filename, 'r') as fh:
+                aliases = IterAliases(fh)
+                while True:
+                    block = list(itertools.islice(aliases, aliasblocksize))
+                    if len(block) == 0:
+                        break
+                    blocks.put(block)
+            blocks.put(None)
+        except Exception as e:
+            blocks.put(e)
 
-    return aliasesdict
+    queues = [queue.Queue(maxsize=readahead) for filename in filenames]
+    for filename, blocks in zip(filenames, queues):
+        threading.Thread(target=ReadAhead, args=(filename, blocks), daemon=True).start()
+
+    # only a hash of each alias and wwn with the file it was last seen in is kept, packed into one
+    # integer, to report conflicts between files without holding the aliases themselves
+    aliasfile = {}
+    wwnfile = {}
+    for index, (filename, blocks) in enumerate(zip(filenames, queues)):
+        while True:
+            block = blocks.get()
+            if block == None:
+                break
+            if isinstance(block, Exception):
+                raise block
+            for alias, wwn in block:
+                if len(filenames) > 1:
+                    wwnkey = WWNKey(wwn)
+                    CheckConflict(aliasfile, hash(alias), wwnkey, index, filenames, "Alias", alias, wwn.strip())
+                    CheckConflict(wwnfile, wwnkey, hash(alias), index, filenames, "WWN", wwn.strip(), alias)
+                yield (alias, wwn)
+
+# a wwn as an integer however it was written, or the hash of anything that is not a wwn
+def WWNKey(wwn):
+    try:
+        return WWN.Parse(wwn)
+    except ValueError:
+        return hash(wwn.strip().lower())
+
+def CheckConflict(seen, key, value, index, filenames, kind, name, text):
+    previous = seen.get(key)
+    if previous != None and previous & 0xffff != index and previous >> 16 != value:
+        print("{0} {1} differs between {2} and {3}, using {4}.".format(kind, name, filenames[previous & 0xffff], filenames[index], text), file=sys.stderr)
+    seen[key] = (value << 16) | index
 
 def StripStrings(aliasesdict, strings):
     newaliasesdict = {}
@@ -95,47 +173,130 @@ def StripStrings(aliasesdict, strings):
 
     return newaliasesdict
 
-def FindEntities(aliasesdict):
+# all of the regexpatterns compiled into one regex, each wrapped in a group named after its
+# position, the entity name is the first group inside the wrapper of the pattern that matched
+class AliasMatcher:
+    def __init__(self, patterns):
+        for pattern in patterns:
+            if re.compile(pattern).groups < 1:
+                raise ValueError("Regex pattern {0} has no group for the entity name.".format(pattern))
+        self.regex = re.compile('|'.join('(?P<p{0}>{1})'.format(i, pattern) for i, pattern in enumerate(patterns)))
+
+    def Match(self, alias):
+        r = self.regex.match(alias)
+        if r:
+            return r.group(r.lastindex + 1)
+
+# strips and matches a run of (alias, wwn), returns (stripped alias, entity name or None, alias,
+# wwn) for each of them in order, each distinct stripped alias is only matched once per run
+def MatchAliases(aliases, matcher, strings=()):
+    rootnames = {}
+    matches = []
+    for alias, wwn in aliases:
+        newalias = alias
+        for str in strings:
+            newalias = newalias.replace(str, '')
+        if newalias not in rootnames:
+            rootnames[newalias] = matcher.Match(newalias)
+        matches.append((newalias, rootnames[newalias], alias, wwn))
+    return matches
+
+# splits the aliases into runs of aliasrunsize as they are read
+def AliasRuns(aliases):
+    aliases = iter(aliases)
+    return iter(lambda: list(itertools.islice(aliases, aliasrunsize)), [])
+
+# matches the aliases in runs across processes, yielding the results in order with only a few
+# runs in flight per process
+def MatchAliasRuns(aliases, matcher, strings, processes):
+    pending = collections.deque()
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        for run in AliasRuns(aliases):
+            pending.append(pool.submit(MatchAliases, run, matcher, strings))
+            if len(pending) >= processes * 2:
+                yield pending.popleft().result()
+        while len(pending) > 0:
+            yield pending.popleft().result()
+
+# strips the strings from the aliases and groups their wwns by entity name in the same pass,
+# giving the same result as StripStrings followed by grouping: when stripping makes aliases
+# collide the first one's place gets the last wwn of the alias that was first seen last, with
+# processes > 1 runs of aliases are matched in parallel and merged back in order
+# aliases is a dict of alias to wwn or an iterable of (alias, wwn), which is read as it goes
+def FindEntities(aliases, strings=(), matcher=None, processes=1):
+    if matcher == None:
+        matcher = AliasMatcher(regexpatterns)
+    if isinstance(aliases, dict):
+        aliases = aliases.items()
+    if processes > 1:
+        runs = MatchAliasRuns(aliases, matcher, strings, processes)
+    else:
+        runs = (MatchAliases(run, matcher, strings) for run in AliasRuns(aliases))
+
     entities = {}
-    for alias in aliasesdict.keys():
-        for pattern in regexpatterns:
-            r = re.match(pattern, alias)
-            if r:
-                rootname = r.group(1)
-                if rootname in entities:
-                    entities[rootname].append(aliasesdict[alias])
+    # where each stripped alias's wwn went, so a later duplicate can replace it, and a hash of
+    # the alias that stripped to it whose wwn is kept, None when that is the stripped alias
+    placed = {}
+    # per stripped alias that aliases collide on, hashes of the aliases that no longer give its wwn
+    superseded = {}
+    for matches in runs:
+        for newalias, rootname, alias, wwn in matches:
+            alias = None if alias == newalias else hash(alias)
+            if newalias not in placed:
+                if rootname != None:
+                    entities.setdefault(rootname, []).append(wwn)
+                    placed[newalias] = (len(entities[rootname]) - 1, alias)
                 else:
-                    entities[rootname] = [aliasesdict[alias]]
-
-                break  # found a match, continue to next alias
+                    placed[newalias] = (None, alias)
+                continue
+            position, winner = placed[newalias]
+            if alias != winner:
+                # an alias seen before the current one was first seen never takes over
+                losers = superseded.setdefault(newalias, set())
+                if alias in losers:
+                    continue
+                losers.add(winner)
+                placed[newalias] = (position, alias)
+            if position != None:
+                entities[rootname][position] = wwn
 
     return entities
 
-def HostOrStorage(wwn):
-    for entry in devicetypewwns:
-        if re.match(entry[0], wwn):
-            return entry[1]
+# all of the devicetypewwns patterns compiled into one regex, each wrapped in a group named
+# after its position so a single match finds the first entry that matches, as the list order did
+class DeviceTypeMatcher:
+    def __init__(self, entries):
+        self.types = [entry[1] for entry in entries]
+        self.regex = re.compile('|'.join('(?P<p{0}>{1})'.format(i, entry[0]) for i, entry in enumerate(entries)))
 
-    return "Host"
+    def Match(self, wwn):
+        r = self.regex.match(wwn)
+        if r:
+            return self.types[int(r.lastgroup[1:])]
+
+# build the matcher once, after the -s and -w overrides have been added to devicetypewwns
+def HostOrStorage(wwn, matcher=None):
+    if matcher == None:
+        matcher = DeviceTypeMatcher(devicetypewwns)
+    return matcher.Match(wwn) or "Host"
 
 def main():
     options = ParseCmdLineParameters()
 
-    aliasesdict = {}
-    # get aliases from the provided text file, or standard input if no file provided
+    # get aliases from the provided text files, or standard input if no file provided
+    # they are read as they are grouped, without holding the whole files in memory
     if options.input != None:
-        for inputfile in options.input.split(','):
-            aliasesdict.update(ReadAliases(open(inputfile,'r')))
+        aliases = IterAliasFiles(options.input.split(','))
     else:
-        aliasfile = sys.stdin
-        aliasesdict.update(ReadAliases(aliasfile))
-
-    # strip out any specified character strings
-    if options.strip !=  None:
-        aliasesdict = StripStrings(aliasesdict, options.strip.split(","))
+        aliases = IterAliases(sys.stdin)
 
-    # parse regular expressions
-    entities = FindEntities(aliasesdict)
+    # strip out any specified character strings and parse regular expressions, in one pass
+    strings = options.strip.split(",") if options.strip != None else []
+    try:
+        matcher = AliasMatcher(regexpatterns)
+    except (ValueError, re.error) as e:
+        PrintHelpAndExit(str(e))
+    entities = FindEntities(aliases, strings, matcher, options.processes)
 
     # output entities to output file or standard output
     if options.output != None:
@@ -144,8 +305,9 @@ def main():
         output = sys.stdout
 
     # assign host or storage type based on input and defaults
+    matcher = DeviceTypeMatcher(devicetypewwns)
     for entity in entities.keys():
-        output.write("{0},{1},{2}\n".format(HostOrStorage(entities[entity][0]), entity, ','.join(entities[entity])))
+        output.write("{0},{1},{2}\n".format(HostOrStorage(entities[entity][0], matcher), entity, ','.join(entities[entity])))
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -7,54 +7,143 @@ __date__ = '2015-02-24'
 __version__ = '1.0'
 
 import optparse, os, sys
+import glob
+from concurrent.futures import ProcessPoolExecutor
+
+# requires WWN.py from this repository
+import WWN
 
 def ParseCmdLineParameters():
     opts = optparse.OptionParser(description='Convert Brocade AliShow output to CSV.')
     opts.add_option("-a", "--alishow", action="store", type="string", dest="alishow")
     opts.add_option("-s", "--switchshow", action="store", type="string", dest="switchshow")
     opts.add_option("-o", "--output", action="store", type="string", dest="output")
+    opts.add_option("-x", "--index", action="store", type="string", dest="index")
+    opts.add_option("-d", "--directory", action="store", type="string", dest="directory")
+    opts.add_option("-j", "--processes", action="store", type="int", dest="processes", default=os.cpu_count() or 1)
     opt, argv = opts.parse_args()
 
+    if opt.directory != None:
+        if opt.alishow != None or opt.switchshow != None:
+            PrintHelpAndExit("Specify either a directory of captures or the AliShow and SwitchShow files.")
+        for directory in opt.directory.split(','):
+            if not os.path.isdir(directory):
+                PrintHelpAndExit("Specified directory {0} does not exist.".format(directory))
+
+    if opt.processes < 1:
+        PrintHelpAndExit("Number of processes must be at least 1.")
+
     return opt
 
 
 def PrintHelpAndExit(errormessage=""):
     if (errormessage != ""):
         print("\n\n" + errormessage)
-    print("\n\nUsage:\n\tBrocadeAliShowToCSV.py [-a <AliShow Text File>] [-s <SwitchShow Text File>] [-o <Output CSV>]\n\n\tIf -a is not specified, AliShow will be read from stdin.\n\tIf -s is not specified, SwitchShow will not be used.\n\tIf -o is not specified, CSV will be output to stdout.\n\n")
+    print("\n\nUsage:\n\tBrocadeAliShowToCSV.py [-a <AliShow Text File>] [-s <SwitchShow Text File>] [-o <Output CSV>] [-x <WWN Index File>]\n\n\tBrocadeAliShowToCSV.py -d <Fabric Directory>[,<Fabric Directory>] [-j <Processes>] [-o <Output CSV>] [-x <WWN Index File>]\n\n\tIf -a is not specified, AliShow will be read from stdin.\n\tIf -s is not specified, SwitchShow will not be used.\n\tIf -o is not specified, CSV will be output to stdout.\n\tIf -x is specified, a WWN to alias index is also written for WWN.py lookups.\n\tA fabric directory holds <switch>.alishow and <switch>.switchshow captures for each switch in one fabric, they are parsed -j at a time and the aliases merged across the fabric.\n\n")
     exit()
 
 def ParseSwitchShow(fh):
     print("Parsing SwitchShow...")
-    portloginsbyslotport = {}
+    return ParseSwitchShowLogins(fh)[1]
+
+# returns the switch's domain, or None if the capture does not show it, and its port logins by index
+def ParseSwitchShowLogins(fh):
+    domain = None
     portloginsbyindex = {}
-    for line in fh.readlines():
-        if(not line.split()[0].isdigit()) or ":" not in line:
+    for line in fh:
+        fields = line.split()
+        if len(fields) >= 2 and fields[0] == "switchDomain:" and fields[1].isdigit():
+            domain = int(fields[1])
+        if len(fields) == 0 or not fields[0].isdigit() or ":" not in line:
             continue
-        else:
-            if len(line.split()) >= 10:
-                portloginsbyslotport[(line.split()[1], line.split()[2])] = line.split()[9]
-                portloginsbyindex[line.split()[0]] = line.split()[9]
+        if len(fields) >= 10:
+            portloginsbyindex[fields[0]] = fields[9]
 
-    return portloginsbyindex
+    return (domain, portloginsbyindex)
 
 def ParseAliShow(fh, portlogins):
     print("Parsing AliShow...")
     aliases = {}
-    for line in fh.readlines():
+    for alias, domain, member in ParseAliShowMembers(fh):
+        if domain != None:
+            if member in portlogins:
+                aliases[alias] = portlogins[member]
+        else:
+            aliases[alias] = member
+
+    return aliases
+
+# yields (alias, domain, port index) for domain,port members and (alias, None, wwn) for wwn members
+def ParseAliShowMembers(fh):
+    for line in fh:
         if "alias:" in line:
             alias = line.split(":")[1].strip()
         elif "," in line:
-            if line.split(",")[1].strip() in portlogins:
-                aliases[alias] = portlogins[line.split(",")[1].strip()]
+            yield (alias, line.split(",")[0].strip(), line.split(",")[1].strip())
         elif ":" in line:
-            aliases[alias] = line.strip()
+            yield (alias, None, line.strip())
+
+# parses one switch's captures in a worker process, returns (switch, domain, port logins by
+# index, alias members), either capture may be missing
+def ParseSwitch(directory, switch):
+    domain, portlogins = None, {}
+    switchshow = os.path.join(directory, switch + '.switchshow')
+    if os.path.exists(switchshow):
+        with open(switchshow, 'r') as fh:
+            domain, portlogins = ParseSwitchShowLogins(fh)
+    members = []
+    alishow = os.path.join(directory, switch + '.alishow')
+    if os.path.exists(alishow):
+        with open(alishow, 'r') as fh:
+            members = list(ParseAliShowMembers(fh))
+    return (switch, domain, portlogins, members)
+
+# parses every switch of every fabric directory, processes at a time, and merges the aliases of
+# each fabric with domain,port members resolved against the port logins of the whole fabric,
+# keyed by (domain, port index) so that the same port index on different switches is kept apart
+# switches are merged in name order and a later definition of an alias wins
+def ParseFabricDirectories(directories, processes=1):
+    aliases = {}
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        for directory in directories:
+            switches = sorted(set(os.path.splitext(os.path.basename(f))[0] for f in glob.glob(os.path.join(directory, '*.alishow')) + glob.glob(os.path.join(directory, '*.switchshow'))))
+            print("Parsing {0} switches in {1}...".format(len(switches), directory))
+            parsed = list(pool.map(ParseSwitch, [directory] * len(switches), switches))
+
+            portlogins = {}
+            for switch, domain, logins, members in parsed:
+                if domain == None and len(logins) > 0:
+                    print("No switchDomain in {0}.switchshow, its port logins are not used.".format(switch), file=sys.stderr)
+                    continue
+                for index, wwn in logins.items():
+                    portlogins[(str(domain), index)] = wwn
+
+            for switch, domain, logins, members in parsed:
+                for alias, memberdomain, member in members:
+                    if memberdomain != None:
+                        if (memberdomain, member) in portlogins:
+                            aliases[alias] = portlogins[(memberdomain, member)]
+                    else:
+                        aliases[alias] = member
 
     return aliases
 
+# (wwn, alias) for the aliases whose member is a single wwn
+def IndexPairs(aliases):
+    for alias in aliases:
+        try:
+            yield (WWN.Parse(aliases[alias]), alias)
+        except ValueError:
+            pass
+
 def main():
     options = ParseCmdLineParameters()
 
+    if options.directory != None:
+        aliases = ParseFabricDirectories(options.directory.split(','), options.processes)
+        WriteAliases(options, aliases)
+        return
+
     if options.alishow != None:
         print("Opening AliShow")
         alishow = open(options.alishow,'r')
@@ -69,7 +158,9 @@ def main():
         portlogins = ParseSwitchShow(switchshow)
 
     aliases = ParseAliShow(alishow, portlogins)
+    WriteAliases(options, aliases)
 
+def WriteAliases(options, aliases):
     if options.output != None:
         output = open(options.output, 'w')
     else:
@@ -79,5 +170,9 @@ def main():
     for alias in aliases:
         output.write("{0},{1}\n".format(aliases[alias], alias))
 
+    if options.index != None:
+        print("Writing Index")
+        WWN.WriteIndex(options.index, IndexPairs(aliases))
+
 if __name__ == '__main__':
     main()
\ No newline at end of file
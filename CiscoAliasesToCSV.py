@@ -18,10 +18,14 @@ __version__ = '1.0'
 import optparse, os, sys
 import re
 
+# requires WWN.py from this repository
+import WWN
+
 def ParseCmdLineParameters():
     opts = optparse.OptionParser(description='Convert Cisco show output to CSV.')
     opts.add_option("-i", "--input", action="store", type="string", dest="input")
     opts.add_option("-o", "--output", action="store", type="string", dest="output")
+    opts.add_option("-x", "--index", action="store", type="string", dest="index")
     opt, argv = opts.parse_args()
 
     return opt
@@ -29,7 +33,7 @@ def ParseCmdLineParameters():
 def PrintHelpAndExit(errormessage=""):
     if (errormessage != ""):
         print("\n\n" + errormessage)
-    print("\n\nUsage:\n\tCiscoAliasesToCSV.py [-i <Input Text File>] [-o <Output CSV>]\n\n\tIf -i is not specified, input will be read from stdin.\n\tIf -o is not specified, CSV will be output to stdout.\n\n")
+    print("\n\nUsage:\n\tCiscoAliasesToCSV.py [-i <Input Text File>] [-o <Output CSV>] [-x <WWN Index File>]\n\n\tIf -i is not specified, input will be read from stdin.\n\tIf -o is not specified, CSV will be output to stdout.\n\tIf -x is specified, a WWN to alias index is also written for WWN.py lookups.\n\n")
     exit()
 
 def ParseAliases(fh):
@@ -42,9 +46,9 @@ def ParseAliases(fh):
 
     alias = None
     wwn = None
-    aliases = {}
+    aliases = WWN.WWNMap()
 
-    for line in fh.readlines():
+    for line in fh:
         # if there's an alias left over it means we are likely in the 2nd line of a fcalias match
         if alias != None:
             m = re_fcalias2.match(line)
@@ -66,8 +70,8 @@ def ParseAliases(fh):
                     alias = m.group(1)
         # if we have an alias and wwn then add it to the list
         if alias != None and wwn != None:
-            # key on wwn so we don't get duplicate aliases
-            aliases[wwn] = alias
+            # key on the wwn as an integer so we don't get duplicate aliases, however it was written
+            aliases.Add(WWN.Parse(wwn), alias)
             alias = None
             wwn = None
 
@@ -88,8 +92,12 @@ def main():
     else:
         output = sys.stdout
 
-    for alias in aliases:
-        output.write("{0},{1}\n".format(alias, aliases[alias]))
+    # written in WWN order, the order the map holds them in
+    for wwn, alias in aliases.items():
+        output.write("{0},{1}\n".format(WWN.Format(wwn), alias))
+
+    if options.index != None:
+        WWN.WriteIndex(options.index, aliases)
 
 if __name__ == '__main__':
     main()
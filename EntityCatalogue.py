@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+
+__author__ = 'nick.york'
+__license__ = 'https://www.apache.org/licenses/LICENSE-2.0'
+__copyright__ = 'Copyright (c) 2015 Virtual Instruments Corporation. All rights reserved.'
+__date__ = '2026-10-18'
+__version__ = '1.0'
+
+# local sqlite catalogue of VirtualWisdom entities, used by ExportEntities, ShowTopology and
+# ExpandApplicationToInitiatorTarget to resolve names without querying the appliance
+
+# requires VirtualWisdom.py from this repository and the python requests module
+import VirtualWisdom
+import os, optparse
+import json
+import sqlite3
+import threading
+
+schema = """
+CREATE TABLE IF NOT EXISTS entities (Id PRIMARY KEY, Name TEXT, DisplayLabel TEXT, Type TEXT, WWN TEXT, Tags TEXT, BeginTime INTEGER, Data TEXT);
+CREATE INDEX IF NOT EXISTS entities_displaylabel ON entities (DisplayLabel);
+CREATE INDEX IF NOT EXISTS entities_type ON entities (Type);
+CREATE INDEX IF NOT EXISTS entities_wwn ON entities (WWN);
+CREATE TABLE IF NOT EXISTS meta (Key TEXT PRIMARY KEY, Value);
+"""
+
+# rows are written to the catalogue this many at a time during a refresh
+insertbatchsize = 1000
+
+# first page size of an incremental refresh, small so that stopping at the first entity that is
+# not new saves reading the rest of the list, later pages double up to the default page size
+refreshpagesize = 100
+
+class EntityCatalogue:
+    def __init__(self, filename):
+        # lookups may come from worker threads, they share the connection under a lock
+        self.db = sqlite3.connect(filename, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.db.executescript(schema)
+
+    def GetMeta(self, key):
+        row = self.db.execute("SELECT Value FROM meta WHERE Key = ?", (key,)).fetchone()
+        return row[0] if row != None else None
+
+    def SetMeta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta (Key, Value) VALUES (?, ?)", (key, value))
+
+    def Insert(self, entities):
+        self.db.executemany("INSERT OR REPLACE INTO entities (Id, Name, DisplayLabel, Type, WWN, Tags, BeginTime, Data) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(e['Id'], e.get('Name'), e.get('DisplayLabel'), e.get('Type'), e['WWN'].lower() if e.get('WWN') else None, json.dumps(e.get('Tags')), e.get('BeginTime') or 0, json.dumps(e)) for e in entities])
+
+    # brings the catalogue up to date with the appliance, a rebuild re-reads every entity while
+    # an incremental refresh asks for each type newest first and stops at the first entity that
+    # is not newer than the last refresh, entities deleted on the appliance need a rebuild to go
+    # pagesize overrides the page size of both
+    def Refresh(self, vw, rebuild=False, pagesize=None):
+        host = self.GetMeta('Host')
+        if host != None and host != vw.host and not rebuild:
+            raise VirtualWisdom.VirtualWisdomError("Catalogue was built from {0}, not {1}.".format(host, vw.host))
+        if rebuild:
+            self.db.execute("DELETE FROM entities")
+            self.db.execute("DELETE FROM meta")
+        self.SetMeta('Host', vw.host)
+        # an incremental refresh can only stop early if the appliance honoured the sort order
+        # the last time every entity was read, otherwise it has to read everything again
+        honourssort = self.GetMeta('Sorted') == 1
+        allsorted = True
+        for entitytype in VirtualWisdom.entitytypes:
+            since = self.GetMeta('BeginTime:' + entitytype) if honourssort else None
+            newest = since or 0
+            previous = None
+            batch = []
+            if pagesize != None:
+                entities = vw.IterEntities(entitytype, pagesize=pagesize, sort=[('BeginTime', 'DESC')])
+            elif since != None:
+                entities = vw.IterEntities(entitytype, pagesize=refreshpagesize, sort=[('BeginTime', 'DESC')], maxpagesize=VirtualWisdom.defaultpagesize)
+            else:
+                entities = vw.IterEntities(entitytype, sort=[('BeginTime', 'DESC')])
+            for e in entities:
+                begintime = e.get('BeginTime') or 0
+                if since != None and begintime < since:
+                    break
+                if previous != None and begintime > previous:
+                    allsorted = False
+                previous = begintime
+                newest = max(newest, begintime)
+                batch.append(e)
+                if len(batch) >= insertbatchsize:
+                    self.Insert(batch)
+                    batch = []
+            self.Insert(batch)
+            self.SetMeta('BeginTime:' + entitytype, newest)
+        self.SetMeta('Sorted', 1 if allsorted else 0)
+        self.db.commit()
+
+    # returns entities in entity type order, as the appliance searches would
+    def Entities(self, query, parameters):
+        with self.lock:
+            rows = [json.loads(row[0]) for row in self.db.execute("SELECT Data FROM entities WHERE " + query + " ORDER BY rowid", parameters)]
+        rows.sort(key=lambda e: VirtualWisdom.entitytypes.index(e['Type']) if e['Type'] in VirtualWisdom.entitytypes else len(VirtualWisdom.entitytypes))
+        return rows
+
+    # entities with exactly this DisplayLabel, optionally of one type
+    def Lookup(self, displaylabel, entitytype=None):
+        if entitytype != None:
+            return self.Entities("DisplayLabel = ? AND Type = ?", (displaylabel, entitytype))
+        return self.Entities("DisplayLabel = ?", (displaylabel,))
+
+    # entities whose DisplayLabel or Tags contain the filter string, like the appliance's filter
+    def Search(self, filter):
+        pattern = '%' + filter.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        return self.Entities("DisplayLabel LIKE ? ESCAPE '\\' OR Tags LIKE ? ESCAPE '\\'", (pattern, pattern))
+
+    def Close(self):
+        self.db.close()
+
+def ParseCmdLineParameters():
+    opts = optparse.OptionParser(description='Build or refresh a local catalogue of VirtualWisdom entities.')
+    opts.add_option("-v", "--virtualwisdom", action="store", type="string", dest="host")
+    opts.add_option("-u", "--username", action="store", type="string", dest="username")
+    opts.add_option("-p", "--password", action="store", type="string", dest="password")
+    opts.add_option("-z", "--password-file", action="store", type="string", dest="passwordfile")
+    opts.add_option("-c", "--catalogue", action="store", type="string", dest="catalogue")
+    opts.add_option("-e", "--entity", action="store", type="string", dest="entity")
+    opts.add_option("-r", "--rebuild", action="store_true", dest="rebuild", default=False)
+    opts.add_option("-g", "--pagesize", action="store", type="int", dest="pagesize")
+    opts.add_option("--stream", action="store_true", dest="stream", default=False)
+    opts.add_option("-m", "--metrics", action="store", type="string", dest="metrics")
+    opts.add_option("--no-session-cache", action="store_true", dest="nosessioncache", default=False)
+    opt, argv = opts.parse_args()
+
+    if opt.catalogue == None or (opt.entity == None and (opt.host == None or opt.username == None or (opt.password == None and opt.passwordfile == None))):
+        PrintHelpAndExit("You must specify the catalogue file and either the VirtualWisdom host, username, password or password file, or an entity to look up.")
+
+    if opt.passwordfile != None:
+        if not os.path.exists(opt.passwordfile):
+            PrintHelpAndExit("Specified password file does not exist.")
+
+    if opt.pagesize != None and opt.pagesize < 1:
+        PrintHelpAndExit("Page size must be at least 1.")
+
+    return opt
+
+def PrintHelpAndExit(errormessage=""):
+    if (errormessage != ""):
+        print("\n\n" + errormessage)
+    print("\n\nUsage:\n\tEntityCatalogue.py -v <VW Appliance IP> -u <Username> [-p <Password>|-z <pwfile>] -c <Catalogue File> [--rebuild] [-g <Page Size>]\n\n\tEntityCatalogue.py -c <Catalogue File> -e <Entity Name>\n\n\t\tRun regularly (eg from cron) to keep the catalogue current, then pass -c <Catalogue File> to ExportEntities.py, ShowTopology.py or ExpandApplicationToInitiatorTarget.py.\n\n")
+    exit()
+
+# logs into VirtualWisdom using the provided credentials, reusing a cached session
+# unless sessioncache is None, and returns the client holding the session
+def VirtualWisdomLogin(ipaddr, login, password, sessioncache=VirtualWisdom.defaultsessioncache, metrics=None):
+    vw = VirtualWisdom.VirtualWisdomClient(ipaddr, metrics=metrics)
+    try:
+        vw.Login(login, password, sessioncache)
+    except VirtualWisdom.VirtualWisdomError as e:
+        PrintHelpAndExit(str(e))
+    return vw
+
+def main():
+    options = ParseCmdLineParameters()
+
+    catalogue = EntityCatalogue(options.catalogue)
+
+    if options.host != None:
+        # request metrics are written to the metrics file when the tool exits
+        metrics = VirtualWisdom.RequestMetrics(options.metrics) if options.metrics != None else None
+        sessioncache = None if options.nosessioncache else VirtualWisdom.defaultsessioncache
+
+        # if the user specified a password use it, otherwise read from the provided password file
+        if options.password != None:
+            vw = VirtualWisdomLogin(options.host, options.username, options.password, sessioncache, metrics)
+        else:
+            vw = VirtualWisdomLogin(options.host, options.username, open(options.passwordfile,'r').readline().strip(), sessioncache, metrics)
+        vw.stream = options.stream
+
+        try:
+            catalogue.Refresh(vw, options.rebuild, options.pagesize)
+        except VirtualWisdom.VirtualWisdomError as e:
+            PrintHelpAndExit(str(e) + "  Use --rebuild to replace it.")
+
+    if options.entity != None:
+        for e in catalogue.Lookup(options.entity):
+            print((e['DisplayLabel'], e['Type'], e['Id']))
+
+    catalogue.Close()
+
+if __name__ == '__main__':
+    main()
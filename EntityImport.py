@@ -6,17 +6,30 @@ __copyright__ = 'Copyright (c) 2015 Virtual Instruments Corporation. All rights
 __date__ = '2015-02-22'
 __version__ = '1.0'
 
-# requires python requests module by Kenneth Reitz
-# http://docs.python-requests.org/en/latest/
-# git clone git://github.com/kennethreitz/requests.git
-# pip3 install requests
-import requests
+# requires VirtualWisdom.py from this repository and the python requests module
+import VirtualWisdom
+import JSONStream
 import json
 import sys, os, optparse
+import zlib
+import hashlib, tempfile
+import io, time, types
+import collections, itertools
+from concurrent.futures import ThreadPoolExecutor
 
-jsonheaders = {'content-type': 'application/json'}
-requests.packages.urllib3.disable_warnings()
-s = requests.session()
+# size of the reads from the import file when streaming the upload
+uploadchunksize = 65536
+
+# batched imports are committed tier by tier, each batch synchronously, so that the entities a
+# batch refers to already exist when it is validated, fcports first, then hosts, arrays and other
+# groupings, then applications
+def ImportTier(entity):
+    entitytype = str(entity.get('type', '')).lower()
+    if entitytype == 'fcport':
+        return 0
+    if entitytype == 'application':
+        return 2
+    return 1
 
 def ParseCmdLineParameters():
     opts = optparse.OptionParser(description='Upload a JSON Entity Import File to VirtualWisdom.')
@@ -27,6 +40,15 @@ def ParseCmdLineParameters():
     opts.add_option("-f", "--file", action="store", type="string", dest="filename")
     opts.add_option("-i", "--stdin", action="store_true", dest="stdin", default=False)
     opts.add_option("-F", "--force", action="store_true", dest="force", default=False)
+    opts.add_option("-s", "--stream", action="store_true", dest="stream", default=False)
+    opts.add_option("-g", "--gzip", action="store_true", dest="gzip", default=False)
+    opts.add_option("-b", "--batchsize", action="store", type="int", dest="batchsize")
+    opts.add_option("-w", "--workers", action="store", type="int", dest="workers", default=1)
+    opts.add_option("-k", "--checkpoint", action="store", type="string", dest="checkpoint")
+    opts.add_option("-d", "--delta", action="store", type="string", dest="delta")
+    opts.add_option("--wait", action="store_true", dest="wait", default=False)
+    opts.add_option("-m", "--metrics", action="store", type="string", dest="metrics")
+    opts.add_option("--no-session-cache", action="store_true", dest="nosessioncache", default=False)
     opt, argv = opts.parse_args()
 
     if opt.host == None or opt.username == None or (opt.password == None and opt.passwordfile == None) or (opt.filename == None and not opt.stdin):
@@ -41,116 +63,415 @@ def ParseCmdLineParameters():
         if not os.path.exists(opt.filename):
             PrintHelpAndExit("Specified entity file does not exist.")
 
+    if opt.gzip and not opt.stream:
+        PrintHelpAndExit("Compressed upload (--gzip) requires --stream.")
+
+    if opt.batchsize != None:
+        if opt.batchsize < 1:
+            PrintHelpAndExit("Batch size must be at least 1.")
+        if opt.stream:
+            PrintHelpAndExit("Batched imports (-b) cannot be combined with --stream.")
+    elif opt.checkpoint != None:
+        PrintHelpAndExit("A checkpoint file (-k) requires a batch size (-b).")
+
+    if opt.delta != None and opt.stream:
+        PrintHelpAndExit("Delta imports (-d) cannot be combined with --stream.")
+
+    if opt.workers < 1:
+        PrintHelpAndExit("Number of workers must be at least 1.")
+
     return opt
 
 
 def PrintHelpAndExit(errormessage=""):
     if (errormessage != ""):
         print("\n\n" + errormessage)
-    print("\n\nUsage:\n\tEntityImport -v <VW Appliance IP> -u <Username> -p <Password> -f <Entity Import File>\n\n\tEntityImport -v <VW Appliance IP> -u <Username> -z <PasswordFile> -f <Entity Import File>\n\n\t\techo 'admin' > pwfile\n\t\tchmod 600 pwfile\n\t\tpython3 EntityImport.py -v 10.20.30.40 -u Administrator -z pwfile -f import.json\n\n")
+    print("\n\nUsage:\n\tEntityImport -v <VW Appliance IP> -u <Username> -p <Password> -f <Entity Import File>\n\n\tEntityImport -v <VW Appliance IP> -u <Username> -z <PasswordFile> -f <Entity Import File>\n\n\t\techo 'admin' > pwfile\n\t\tchmod 600 pwfile\n\t\tpython3 EntityImport.py -v 10.20.30.40 -u Administrator -z pwfile -f import.json\n\n\tAdd -b <Batch Size> [-w <Workers>] [-k <Checkpoint File>] to import in several transactions, validated concurrently and committed in order, resuming after the last committed batch on a rerun.\n\n\tAdd -d <State File> to upload only the entities added, changed or removed since the last import recorded in the state file.\n\n\tAdd --wait to commit synchronously and report the time taken by each phase.\n\n\tAdd --stream to validate and upload the file in one pass without loading it into memory, and --gzip to compress the upload.\n\n")
     exit()
 
 # the server will do a much more thorough job of validating
 # this is just making sure that the user has really specified a json file
 # and that it has a version, before we start logging into VW
-def ValidateJSON(fh=None,str=None):
+def ValidateJSON(fh=None,string=None):
     try:
         if fh is not None:
             inputobject = json.load(fh)
         else:
-            inputobject = json.loads(str)
+            inputobject = json.loads(string)
     except ValueError as e:
-        PrintHelpAndExit("Provided JSON could not be parsed.\n\n" + e)
+        PrintHelpAndExit("Provided JSON could not be parsed.\n\n" + "{0}".format(e))
     if ("version" not in inputobject or inputobject["version"] != 1):
         PrintHelpAndExit("Provided JSON does not conform to VW4 Entity Import standard.  Version number mismatch.")
     if ("entities" not in inputobject or len(inputobject["entities"]) == 0):
         PrintHelpAndExit("Provided JSON contains no entities.")
-    return True
+    return inputobject
+
+class ImportValidationError(ValueError):
+    pass
 
-# logs into VirtualWisdom using the provided credentials
-# on the global session
-def VirtualWisdomLogin(ipaddr, login, password):
-    loginpayload = {'username': login, 'password': password, 'targetRoute': None}
+# yields the import file a chunk at a time for a streaming upload, optionally gzip compressed,
+# checking the same things as ValidateJSON as the chunks go past, one entity in memory at a time
+# raises ImportValidationError part way through the upload if the file turns out to be invalid,
+# which aborts the request before anything can be committed
+def StreamDocument(fh, gzip=False, timer=None):
+    parser = JSONStream.JSONStreamParser(('entities',))
+    compressor = zlib.compressobj(wbits=31) if gzip else None
     try:
-        # undocumented and unsupported apis, subject to change in every release
-        r = s.post('https://{0}/api/sec/login'.format(ipaddr), verify=False, data=loginpayload)
-        if r.status_code == 200:
-            # undocumented and unsupported apis, subject to change in every release
-            r = s.get('https://{0}/api/sec/session'.format(ipaddr), verify=False)
-            if r.json()['status'] == "OK":
-                return
-            else:
-                PrintHelpAndExit("Logged into VirtualWisdom but session check was unsuccessful.")
-        else:
-            PrintHelpAndExit("Unable to connect to VirtualWisdom with provided information.")
-    except:
-        PrintHelpAndExit("Exception caught in the VirtualWisdom login process.")
+        while True:
+            chunk = fh.read(uploadchunksize)
+            if len(chunk) == 0:
+                break
+            if len(parser.Feed(chunk)) > 0 and parser.scalars.get(('version',), 1) != 1:
+                raise ImportValidationError("Provided JSON does not conform to VW4 Entity Import standard.  Version number mismatch.")
+            yield compressor.compress(chunk) if gzip else chunk
+        parser.Close()
+    except ImportValidationError:
+        raise
+    except ValueError as e:
+        raise ImportValidationError("Provided JSON could not be parsed.\n\n" + "{0}".format(e))
+    if parser.scalars.get(('version',)) != 1:
+        raise ImportValidationError("Provided JSON does not conform to VW4 Entity Import standard.  Version number mismatch.")
+    if parser.itemcount == 0:
+        raise ImportValidationError("Provided JSON contains no entities.")
+    if timer != None:
+        timer.entities = parser.itemcount
+    if gzip:
+        yield compressor.flush()
+
+# wall clock time spent in each phase of an import, with --wait
+class ImportTimer:
+    def __init__(self):
+        self.start = self.mark = time.time()
+        self.phases = {}
+        self.entities = 0
+
+    # charges the time since the end of the previous phase to this one
+    def Phase(self, name):
+        now = time.time()
+        self.phases[name] = self.phases.get(name, 0) + now - self.mark
+        self.mark = now
+
+    def Report(self):
+        elapsed = time.time() - self.start
+        for name, seconds in self.phases.items():
+            print("{0}: {1:.1f}s".format(name.capitalize(), seconds))
+        print("Total: {0:.1f}s for {1} entities, {2:.0f} entities/second".format(elapsed, self.entities, self.entities / elapsed if elapsed > 0 else 0))
+
+# the upload phase ends when the last of the request body has been read, the appliance
+# validates the import before it responds
+class TimedBuffer(io.BytesIO):
+    def __init__(self, data, timer):
+        io.BytesIO.__init__(self, data)
+        self.timer = timer
+        self.uploaded = False
+
+    def read(self, *args):
+        chunk = io.BytesIO.read(self, *args)
+        if len(chunk) == 0 and not self.uploaded:
+            self.uploaded = True
+            self.timer.Phase('upload')
+        return chunk
+
+def TimedChunks(chunks, timer):
+    for chunk in chunks:
+        yield chunk
+    timer.Phase('upload')
+
+def TimedBody(data, timer):
+    if isinstance(data, types.GeneratorType):
+        return TimedChunks(data, timer)
+    if hasattr(data, 'read'):
+        data = data.read()
+    return TimedBuffer(data.encode('utf-8') if isinstance(data, str) else data, timer)
+
+# logs into VirtualWisdom using the provided credentials, reusing a cached session
+# unless sessioncache is None, and returns the client holding the session
+def VirtualWisdomLogin(ipaddr, login, password, sessioncache=VirtualWisdom.defaultsessioncache, metrics=None):
+    vw = VirtualWisdom.VirtualWisdomClient(ipaddr, metrics=metrics)
+    try:
+        vw.Login(login, password, sessioncache)
+    except VirtualWisdom.VirtualWisdomError as e:
+        PrintHelpAndExit(str(e))
+    return vw
 
 # uploads entity import file, checks validation and commits changes if validation successful
-def UploadEntityImport(ipaddr, fh=None, str=None, force=False):
+# with wait the commit is synchronous, a failed commit exits non-zero and timer records the phases
+def UploadEntityImport(vw, fh=None, str=None, force=False, gzip=False, wait=False, timer=None):
     #try:
-    # undocumented and unsupported apis, subject to change in every release
-    if fh is not None:
-        r = s.post('https://%s/api/config/entity/import/start' % (ipaddr), verify=False, data=fh, headers=jsonheaders)
-    else:
-        r = s.post('https://%s/api/config/entity/import/start' % (ipaddr), verify=False, data=str, headers=jsonheaders)
+    data = fh if fh is not None else str
+    if timer != None:
+        data = TimedBody(data, timer)
+    r = vw.ImportStart(data, gzip)
+    if timer != None:
+        timer.Phase('validate')
+    if gzip and r.status_code == 415:
+        print("\n\nVirtualWisdom does not accept compressed uploads, run again without --gzip.\n")
+        sys.exit(1)
     if r.status_code == 200 and r.json()['status'] == "OK":
         transactionid = r.json()['result']['transactionId']
-        commitpayload = {"transactionId":transactionid,"async":"true"}
-        # undocumented and unsupported apis, subject to change in every release
-        r = s.put('https://{0}/api/config/entity/import/commit'.format(ipaddr), verify=False, data=json.dumps(commitpayload), headers=jsonheaders)
+        r = vw.ImportCommit(transactionid, wait)
+        if timer != None:
+            timer.Phase('commit')
+        if wait and not (r.status_code == 200 and r.json()['status'] == "OK"):
+            print(r.status_code)
+            print("Commit failed.")
+            sys.exit(1)
         return True
     else:
-        # loop through the errors and print them all out
-        for entity in r.json()['result']['entities']:
-            try:
-                print("\nMessage: " + entity['marker']['message'])
-                print("Entity: {0} [{1}]".format(entity['name'], entity['type']))
-                print("Location: Line: {0} Column: {1}".format(entity['marker']['location']['line'], entity['marker']['location']['column']))
-            except:
-                pass
+        PrintValidationErrors(r)
 
         if not force:
             print("\n\nValidation failure.  To attempt to import anyway run again with --force\n")
             exit()
         else:
             transactionid = r.json()['result']['transactionId']
-            commitpayload = {"transactionId":transactionid,"async":"true"}
-            # undocumented and unsupported apis, subject to change in every release
-            r = s.put('https://{0}/api/config/entity/import/commit'.format(ipaddr), verify=False, data=json.dumps(commitpayload), headers=jsonheaders)
+            r = vw.ImportCommit(transactionid, wait)
+            if timer != None:
+                timer.Phase('commit')
             if r.status_code == 200 and r.json()['status'] == "OK":
                 return True
             else:
                 print(r.status_code)
                 print(r.json()['status'])
                 print("Force failed.")
-                exit()
+                sys.exit(1)
     #except:
     #    PrintHelpAndExit("Exception caught during Entity Import.")
 
+# loop through the errors of a failed import start and print them all out
+def PrintValidationErrors(r):
+    for entity in r.json()['result']['entities']:
+        try:
+            print("\nMessage: " + entity['marker']['message'])
+            print("Entity: {0} [{1}]".format(entity['name'], entity['type']))
+            print("Location: Line: {0} Column: {1}".format(entity['marker']['location']['line'], entity['marker']['location']['column']))
+        except:
+            pass
+
+# splits the entities into batches of at most batchsize, a list of batches per tier
+def ImportBatches(entities, batchsize):
+    tiers = [[], [], []]
+    for entity in entities:
+        tiers[ImportTier(entity)].append(entity)
+    return [[tier[i:i + batchsize] for i in range(0, len(tier), batchsize)] for tier in tiers]
+
+# the checkpoint records a hash of every committed batch, so a rerun skips the batches that are
+# unchanged and still imports one that was fixed after failing validation
+def JSONHash(obj):
+    return hashlib.sha256(json.dumps(obj, sort_keys=True).encode('utf-8')).hexdigest()
+
+def ReadCheckpoint(checkpoint):
+    if checkpoint == None or not os.path.exists(checkpoint):
+        return set()
+    with open(checkpoint, 'r') as fh:
+        return set(json.load(fh).get('committed', []))
+
+def WriteCheckpoint(checkpoint, committed):
+    if checkpoint != None:
+        WriteJSONFile(checkpoint, {'committed': sorted(committed)})
+
+# replaces the file in one step, so an interrupted run never leaves it half written
+def WriteJSONFile(filename, obj):
+    fd, tmpname = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)))
+    with os.fdopen(fd, 'w') as fh:
+        json.dump(obj, fh)
+    os.replace(tmpname, filename)
+
+# imports the entities in several transactions, the batches of a tier are validated concurrently
+# and committed in order, and the checkpoint is updated after every commit so that a rerun
+# resumes after the last committed batch, a failed batch stops the import at that batch
+# every commit is synchronous, so a batch is only recorded in the checkpoint once the appliance
+# has applied it and the next tier is only validated once the tier before it is in place
+# no more than workers batches are uploaded ahead of the one being committed, so a failure
+# costs at most that many wasted validations, the rest are never sent
+# the batches are uploaded while others are validated, so timer charges both to validation
+def UploadEntityImportBatches(vw, entities, batchsize, workers=1, checkpoint=None, force=False, timer=None):
+    committed = ReadCheckpoint(checkpoint)
+    tiers = ImportBatches(entities, batchsize)
+    total = sum(len(tier) for tier in tiers)
+    start = 0
+    for tier in tiers:
+        pending = [(start + i, batch, JSONHash(batch)) for i, batch in enumerate(tier)]
+        pending = iter([b for b in pending if b[2] not in committed])
+        start += len(tier)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            started = collections.deque()
+            def StartNext(count=1):
+                for b in itertools.islice(pending, count):
+                    started.append((b, pool.submit(vw.ImportStart, json.dumps({"version": 1, "entities": b[1]}))))
+            # the batches already sent are left to finish but the queued ones are dropped
+            def Abandon():
+                for b, future in started:
+                    future.cancel()
+            StartNext(workers)
+            while len(started) > 0:
+                (index, batch, batchhash), future = started.popleft()
+                r = future.result()
+                if timer != None:
+                    timer.Phase('validate')
+                if not (r.status_code == 200 and r.json()['status'] == "OK"):
+                    PrintValidationErrors(r)
+                    if not force:
+                        Abandon()
+                        print("\n\nValidation failure in batch {0} of {1}.  Fix it and run again to resume, or run again with --force\n".format(index + 1, total))
+                        sys.exit(1)
+                StartNext()
+                r = vw.ImportCommit(r.json()['result']['transactionId'], True)
+                if timer != None:
+                    timer.Phase('commit')
+                    timer.entities += len(batch)
+                if not (r.status_code == 200 and r.json()['status'] == "OK"):
+                    Abandon()
+                    print(r.status_code)
+                    print("Commit of batch {0} of {1} failed.".format(index + 1, total))
+                    sys.exit(1)
+                committed.add(batchhash)
+                WriteCheckpoint(checkpoint, committed)
+                print("Committed batch {0} of {1} ({2} entities).".format(index + 1, total, len(batch)))
+    # a finished import leaves nothing to resume
+    if checkpoint != None and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return True
+
+# entities are matched between imports by type and name
+def EntityKey(entity):
+    return (str(entity.get('type', '')).lower(), entity.get('name'))
+
+# the state file holds every entity of the last successful delta import with its hash,
+# the entities are kept so that members dropped since then can be removed
+def ReadState(statefile, host):
+    if not os.path.exists(statefile):
+        return {}
+    with open(statefile, 'r') as fh:
+        state = json.load(fh)
+    if state.get('host') != host:
+        return {}
+    return dict((EntityKey(applied['entity']), applied) for applied in state['entities'])
+
+# (type, name) of every entity on the appliance, for the types in VirtualWisdom.entitytypes
+def ExistingEntities(vw, workers=1):
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(lambda entitytype: [(e['Type'].lower(), e['DisplayLabel']) for e in vw.IterEntities(entitytype)], VirtualWisdom.entitytypes)
+        return set(key for keys in results for key in keys)
+
+# the edits that undo what the previous import of an entity added but the new one does not,
+# members are removed by name and itl patterns by repeating them with edit_type remove
+def RemovalEdits(previous, entity=None):
+    removal = {"name": previous.get('name'), "type": previous.get('type')}
+    previousmembers = previous.get('child_entities', {}).get('add', [])
+    members = entity.get('child_entities', {}).get('add', []) if entity != None else []
+    removedmembers = [m for m in previousmembers if m not in members]
+    if len(removedmembers) > 0:
+        removal['child_entities'] = {"remove": removedmembers}
+    patterns = [dict((k, v) for k, v in p.items() if k != 'edit_type') for p in entity.get('itl_patterns', [])] if entity != None else []
+    removedpatterns = []
+    for p in previous.get('itl_patterns', []):
+        pattern = dict((k, v) for k, v in p.items() if k != 'edit_type')
+        if p.get('edit_type') == 'add' and pattern not in patterns:
+            pattern['edit_type'] = 'remove'
+            removedpatterns.append(pattern)
+    if len(removedpatterns) > 0:
+        removal['itl_patterns'] = removedpatterns
+    return removal
+
+# returns the entities to upload and the state to save once they are imported
+# an entity is uploaded if it is new, if its hash differs from the last import or if the
+# appliance lists entities of its type but no longer has it, changed entities also carry the
+# removal of members they dropped, and entities no longer in the document have all the
+# members and itl patterns of their last import removed
+def DeltaEntities(entities, previous, existing, host):
+    existingtypes = set(entitytype.lower() for entitytype in VirtualWisdom.entitytypes)
+    delta = []
+    applied = {}
+    counts = {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': 0}
+    for entity in entities:
+        key = EntityKey(entity)
+        entityhash = JSONHash(entity)
+        applied[key] = {'hash': entityhash, 'entity': entity}
+        last = previous.get(key)
+        onappliance = key in existing or key[0] not in existingtypes
+        if last == None or not onappliance:
+            counts['added'] += 1
+            delta.append(entity)
+        elif last['hash'] != entityhash:
+            counts['changed'] += 1
+            removal = RemovalEdits(last['entity'], entity)
+            merged = dict(entity)
+            if 'child_entities' in removal:
+                merged['child_entities'] = dict(entity.get('child_entities', {}), remove=removal['child_entities']['remove'])
+            if 'itl_patterns' in removal:
+                merged['itl_patterns'] = entity.get('itl_patterns', []) + removal['itl_patterns']
+            delta.append(merged)
+        else:
+            counts['unchanged'] += 1
+    for key, last in previous.items():
+        if key not in applied and (key in existing or key[0] not in existingtypes):
+            removal = RemovalEdits(last['entity'])
+            # an entity without members, like an fcport nickname, has nothing to remove
+            if len(removal) > 2:
+                counts['removed'] += 1
+                delta.append(removal)
+    state = {'host': host, 'entities': list(applied.values())}
+    return (delta, state, counts)
+
 
 def main():
     options = ParseCmdLineParameters()
 
     # if the user specified an entity file, use it otherwise read from standard input
-    if options.filename != None:
-        ValidateJSON(fh=open(options.filename, 'r'))
+    # a streaming upload is validated as it is sent instead
+    if options.stream:
+        pass
     else:
-        stdinstring = ''.join(sys.stdin.readlines())
-        ValidateJSON(str=stdinstring)
+        inputstring = open(options.filename, 'r').read() if options.filename != None else ''.join(sys.stdin.readlines())
+        document = ValidateJSON(string=inputstring)
+
+    # request metrics are written to the metrics file when the tool exits
+    metrics = VirtualWisdom.RequestMetrics(options.metrics) if options.metrics != None else None
+    sessioncache = None if options.nosessioncache else VirtualWisdom.defaultsessioncache
 
     # if the user specified a password use it, otherwise read from the provided password file
     if options.password != None:
-        VirtualWisdomLogin(options.host, options.username, options.password)
+        vw = VirtualWisdomLogin(options.host, options.username, options.password, sessioncache, metrics)
     else:
-        VirtualWisdomLogin(options.host, options.username, open(options.passwordfile,'r').readline().strip())
+        vw = VirtualWisdomLogin(options.host, options.username, open(options.passwordfile,'r').readline().strip(), sessioncache, metrics)
+
+    # only the difference from the last import is uploaded, the state is saved once it is imported
+    if options.delta != None:
+        entities, state, counts = DeltaEntities(document['entities'], ReadState(options.delta, vw.host), ExistingEntities(vw, options.workers), vw.host)
+        print("{added} added, {changed} changed, {removed} removed, {unchanged} unchanged.".format(**counts))
+        if len(entities) == 0:
+            WriteJSONFile(options.delta, state)
+            print("Nothing to import.")
+            return
+        document = {"version": 1, "entities": entities}
+        inputstring = json.dumps(document)
+
+    # the state may only record an import the appliance has applied, so a delta import always
+    # commits synchronously, a commit that is only accepted could still fail afterwards
+    wait = options.wait or options.delta != None
+
+    # timing starts once logged in, so that it covers only the import itself
+    timer = ImportTimer() if options.wait else None
+    if timer != None and not options.stream and options.batchsize == None:
+        timer.entities = len(document['entities'])
 
     # if the user specified an entity file, use it otherwise read from standard input
-    if options.filename != None:
-        UploadEntityImport(options.host, fh=open(options.filename, 'r'), force=options.force)
+    if options.stream:
+        inputfile = open(options.filename, 'rb') if options.filename != None else sys.stdin.buffer
+        try:
+            UploadEntityImport(vw, fh=StreamDocument(inputfile, options.gzip, timer), force=options.force, gzip=options.gzip, wait=wait, timer=timer)
+        except ImportValidationError as e:
+            PrintHelpAndExit(str(e))
+    elif options.batchsize != None:
+        UploadEntityImportBatches(vw, document['entities'], options.batchsize, options.workers, options.checkpoint, options.force, timer)
     else:
-        UploadEntityImport(options.host, str=stdinstring, force=options.force)
+        UploadEntityImport(vw, str=inputstring, force=options.force, wait=wait, timer=timer)
+    if options.delta != None:
+        WriteJSONFile(options.delta, state)
     print("Successfully Imported!")
+    if timer != None:
+        timer.Report()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
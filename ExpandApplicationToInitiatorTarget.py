@@ -6,17 +6,14 @@ __copyright__ = 'Copyright (c) 2015 Virtual Instruments Corporation. All rights
 __date__ = '2015-02-22'
 __version__ = '1.0'
 
-# requires python requests module by Kenneth Reitz
-# http://docs.python-requests.org/en/latest/
-# git clone git://github.com/kennethreitz/requests.git
-# pip3 install requests
-import requests
+# requires VirtualWisdom.py from this repository and the python requests module
+import VirtualWisdom
+import EntityCatalogue
+import EntityImport
 import json
 import sys, os, optparse
-
-jsonheaders = {'content-type': 'application/json'}
-requests.packages.urllib3.disable_warnings()
-s = requests.session()
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 def ParseCmdLineParameters():
     opts = optparse.OptionParser(description='Upload a JSON Entity Import File to VirtualWisdom.')
@@ -28,6 +25,14 @@ def ParseCmdLineParameters():
     opts.add_option("-e", "--hostlist", action="store", type="string", dest="hostlist")
     opts.add_option("-n", "--newname", action="store", type="string", dest="newname")
     opts.add_option("-o", "--output", action="store", type="string", dest="output")
+    opts.add_option("-b", "--batchsize", action="store", type="int", dest="batchsize", default=VirtualWisdom.defaultbatchsize)
+    opts.add_option("-w", "--workers", action="store", type="int", dest="workers", default=1)
+    opts.add_option("-j", "--json", action="store_true", dest="json", default=False)
+    opts.add_option("--upload", action="store_true", dest="upload", default=False)
+    opts.add_option("-c", "--catalogue", action="store", type="string", dest="catalogue")
+    opts.add_option("--stream", action="store_true", dest="stream", default=False)
+    opts.add_option("-m", "--metrics", action="store", type="string", dest="metrics")
+    opts.add_option("--no-session-cache", action="store_true", dest="nosessioncache", default=False)
     opt, argv = opts.parse_args()
 
     if opt.host == None or opt.username == None or (opt.password == None and opt.passwordfile == None) or (opt.application == None and opt.hostlist == None) or opt.newname == None:
@@ -38,109 +43,195 @@ def ParseCmdLineParameters():
         if not os.path.exists(opt.passwordfile):
             PrintHelpAndExit("Specified password file does not exist.")
 
+    if opt.catalogue != None:
+        if not os.path.exists(opt.catalogue):
+            PrintHelpAndExit("Specified catalogue file does not exist.")
+
+    if opt.upload and not opt.json:
+        PrintHelpAndExit("Uploading requires the JSON entity import output (--json).")
+
+    if opt.batchsize < 1:
+        PrintHelpAndExit("Batch size must be at least 1.")
+
+    if opt.workers < 1:
+        PrintHelpAndExit("Number of workers must be at least 1.")
+
     return opt
 
 
 def PrintHelpAndExit(errormessage=""):
     if (errormessage != ""):
         print("\n\n" + errormessage)
-    print("\n\nUsage:\n\tExpandApplicationToInitiatorTarget.py -v <VW Appliance IP> -u <Username> [-p <Password>|-z <pwfile>] -a <Application Name> -n <New Application Name>\n\n\tExpandApplicationToInitiatorTarget.py -v <VW Appliance IP> -u <Username> [-p <Password>|-z <pwfile>] -e <Host>[,<Host][,<Host>] -n <New Application Name>\n\n")
+    print("\n\nUsage:\n\tExpandApplicationToInitiatorTarget.py -v <VW Appliance IP> -u <Username> [-p <Password>|-z <pwfile>] -a <Application Name> -n <New Application Name>\n\n\tExpandApplicationToInitiatorTarget.py -v <VW Appliance IP> -u <Username> [-p <Password>|-z <pwfile>] -e <Host>[,<Host][,<Host>] -n <New Application Name>\n\n\tAdd --json to write a VW4 entity import file instead of CSV, and --upload to import it straight away.\n\n")
     exit()
 
-# logs into VirtualWisdom using the provided credentials
-# on the global session
-def VirtualWisdomLogin(ipaddr, login, password):
-    loginpayload = {'username': login, 'password': password, 'targetRoute': None}
+# logs into VirtualWisdom using the provided credentials, reusing a cached session
+# unless sessioncache is None, and returns the client holding the session
+def VirtualWisdomLogin(ipaddr, login, password, sessioncache=VirtualWisdom.defaultsessioncache, poolsize=VirtualWisdom.defaultpoolsize, metrics=None):
+    vw = VirtualWisdom.VirtualWisdomClient(ipaddr, poolsize=poolsize, metrics=metrics)
     try:
-        # undocumented and unsupported apis, subject to change in every release
-        r = s.post('https://{0}/api/sec/login'.format(ipaddr), verify=False, data=loginpayload)
-        if r.status_code == 200:
-            # undocumented and unsupported apis, subject to change in every release
-            r = s.get('https://{0}/api/sec/session'.format(ipaddr), verify=False)
-            if r.json()['status'] == "OK":
-                return
-            else:
-                PrintHelpAndExit("Logged into VirtualWisdom but session check was unsuccessful.")
-        else:
-            PrintHelpAndExit("Unable to connect to VirtualWisdom with provided information.")
-    except:
-        PrintHelpAndExit("Exception caught in the VirtualWisdom login process.")
-
-def GetEntityId(ipaddr, entity, entitytype):
-    # undocumented and unsupported apis, subject to change in every release
-    r = s.get('https://{0}/api/entitymgmt/entities?filter={1}&filterKeys=DisplayLabel%2CTags&filterValues={1}&type={2}&page=1&start=0&limit=500000'.format(ipaddr, entity, entitytype), verify=False)
-    if r.status_code == 200 and r.json()['status'] == "OK":
-        for e in r.json()['result']['data']:
-            if e['DisplayLabel'] == entity:
-                return e['Id']
-
-def GetTopology(ipaddr, entityid, fab1):
+        vw.Login(login, password, sessioncache)
+    except VirtualWisdom.VirtualWisdomError as e:
+        PrintHelpAndExit(str(e))
+    return vw
+
+def GetEntityId(vw, entity, entitytype, catalogue=None):
+    found = catalogue.Lookup(entity, entitytype) if catalogue != None else []
+    for e in found or vw.GetEntities(entitytype, filter=entity):
+        if e['DisplayLabel'] == entity:
+            return e['Id']
+
+def GetTopology(vw, entityid, fab1, fabrics):
     payload = {"appId":"-1","hostFilter":{"type":"HostPort","entityIds":[entityid]},"storageFilter":{"type":"StoragePort"}}
 
-    # undocumented and unsupported apis, subject to change in every release
-    r = s.put('https://{0}/api/topo/filter4/graph'.format(ipaddr), data=json.dumps(payload), headers=jsonheaders, verify=False)
     storageports = []
-    if r.status_code == 200 and r.json()['status'] == "OK":
-        for node in r.json()['result']['nodes']:
-            if 'DeviceType' in r.json()['result']['nodes'][node] and r.json()['result']['nodes'][node]['DeviceType'] == 'STORAGE':
-                fab2 = GetFabric(ipaddr, r.json()['result']['nodes'][node]['Id'])
-                if fab1 == fab2:
-                    storageports.append(r.json()['result']['nodes'][node]['DisplayLabel'])
+    nodes = vw.GetTopologyGraph(payload).Nodes('STORAGE')
+    fabrics.Prefetch([node['Id'] for node in nodes])
+    for node in nodes:
+        fab2 = fabrics.Get(node['Id'])
+        if fab1 == fab2:
+            storageports.append(node['DisplayLabel'])
 
     return storageports
 
-def GetHBAs(ipaddr, entityid, entitytype):
+def GetHBAs(vw, entityid, entitytype):
     if entitytype == 'Application':
         payload = {"appId":entityid,"hostFilter":{"type":"HostPort"}}
     else:
         payload = {"appId":"-1","hostFilter":{"type":"HostPort","entityIds":[entityid]}}
 
-    # undocumented and unsupported apis, subject to change in every release
-    r = s.put('https://{0}/api/topo/filter4/graph'.format(ipaddr), data=json.dumps(payload), headers=jsonheaders, verify=False)
     hbas = []
-    if r.status_code == 200 and r.json()['status'] == "OK":
-        for node in r.json()['result']['nodes']:
-            if 'DeviceType' in r.json()['result']['nodes'][node] and r.json()['result']['nodes'][node]['DeviceType'] == 'SERVER':
-                hbas.append((r.json()['result']['nodes'][node]['DisplayLabel'], r.json()['result']['nodes'][node]['Id']))
+    for node in vw.GetTopologyGraph(payload).Nodes('SERVER'):
+        hbas.append((node['DisplayLabel'], node['Id']))
 
     return hbas
 
-def GetFabric(ipaddr, entityid):
-    # undocumented and unsupported apis, subject to change in every release
-    r = s.get('https://{0}/api/entitymgmt/entity/properties?ids={1}&withArchived=false'.format(ipaddr, entityid), verify=False)
-    if r.status_code == 200 and r.json()['status'] == "OK":
-        return r.json()['result'][0]['LogicalFabric DisplayLabel']
+# returns the hbas of every host in host order, resolving up to workers hosts at a time
+def GetHostHBAs(vw, hosts, catalogue=None, workers=1):
+    def HostHBAs(host):
+        return GetHBAs(vw, GetEntityId(vw, host, 'Host', catalogue), 'Host')
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return [hba for hbas in pool.map(HostHBAs, hosts) for hba in hbas]
+
+# yields the entity import document for the new application a piece at a time, one itl pattern
+# per hba and target, in the format CSVRelationsToJSON produces for Initiator:Target members
+def ImportDocument(name, topo):
+    yield '{{\n  "version": 1,\n  "entities": [\n    {{\n      "name": {0},\n      "type": "Application",\n      "itl_patterns": ['.format(json.dumps(name))
+    separator = '\n'
+    for hba in topo:
+        for targ in topo[hba]:
+            yield separator + '        ' + json.dumps({"edit_type": "add", "initiator": hba[0], "target": targ})
+            separator = ',\n'
+    yield '\n      ]\n    }\n  ]\n}'
+
+# logical fabric of each port, fetched at most once per run through batched properties requests
+# safe to share between worker threads, an id already being fetched by one thread is waited for
+# by the others rather than fetched again
+class FabricCache:
+    def __init__(self, vw, batchsize=VirtualWisdom.defaultbatchsize, workers=1):
+        self.vw = vw
+        self.batchsize = batchsize
+        self.workers = workers
+        self.fabrics = {}
+        self.inflight = {}
+        self.lock = threading.Lock()
+
+    # looks up the fabrics of whichever of the ids are not already known
+    def Prefetch(self, entityids):
+        with self.lock:
+            missing = []
+            waiting = {}
+            for entityid in dict.fromkeys(entityids):
+                if entityid in self.fabrics:
+                    continue
+                if entityid in self.inflight:
+                    waiting.setdefault(self.inflight[entityid], []).append(entityid)
+                else:
+                    missing.append(entityid)
+            done = threading.Event()
+            for entityid in missing:
+                self.inflight[entityid] = done
+        if len(missing) > 0:
+            try:
+                properties = self.vw.GetPropertiesById(missing, self.batchsize, self.workers)
+                with self.lock:
+                    for entityid in missing:
+                        self.fabrics[entityid] = properties[entityid].get('LogicalFabric DisplayLabel') if entityid in properties else None
+            finally:
+                with self.lock:
+                    for entityid in missing:
+                        del self.inflight[entityid]
+                done.set()
+        for event, entityids in waiting.items():
+            event.wait()
+        # ids whose fetch failed in another thread are fetched again here
+        failed = [entityid for entityids in waiting.values() for entityid in entityids if entityid not in self.fabrics]
+        if len(failed) > 0:
+            self.Prefetch(failed)
+
+    def Get(self, entityid):
+        self.Prefetch([entityid])
+        return self.fabrics[entityid]
 
 def main():
     options = ParseCmdLineParameters()
 
+    # request metrics are written to the metrics file when the tool exits
+    metrics = VirtualWisdom.RequestMetrics(options.metrics) if options.metrics != None else None
+    sessioncache = None if options.nosessioncache else VirtualWisdom.defaultsessioncache
+
     # if the user specified a password use it, otherwise read from the provided password file
     if options.password != None:
-        VirtualWisdomLogin(options.host, options.username, options.password)
+        vw = VirtualWisdomLogin(options.host, options.username, options.password, sessioncache, max(options.workers, VirtualWisdom.defaultpoolsize), metrics)
     else:
-        VirtualWisdomLogin(options.host, options.username, open(options.passwordfile,'r').readline().strip())
+        vw = VirtualWisdomLogin(options.host, options.username, open(options.passwordfile,'r').readline().strip(), sessioncache, max(options.workers, VirtualWisdom.defaultpoolsize), metrics)
+    vw.stream = options.stream
+
+    # names are looked up in the local entity catalogue first when one is given
+    catalogue = EntityCatalogue.EntityCatalogue(options.catalogue) if options.catalogue != None else None
+
+    fabrics = FabricCache(vw, options.batchsize, options.workers)
 
-    topo = {}
     if options.application != None:
-        entityid = GetEntityId(options.host, options.application, 'Application')
-        hbas = GetHBAs(options.host, entityid, 'Application')
-        for hba in hbas:
-            fab = GetFabric(options.host, hba[1])
-            topo[hba] = GetTopology(options.host, hba[1], fab)
+        entityid = GetEntityId(vw, options.application, 'Application', catalogue)
+        hbas = GetHBAs(vw, entityid, 'Application')
     else:
-        for entity in options.hostlist.split(","):
-            entityid = GetEntityId(options.host, entity.strip(), 'Host')
-            hbas = GetHBAs(options.host, entityid, 'Host')
-            for hba in hbas:
-                fab = GetFabric(options.host, hba[1])
-                topo[hba] = GetTopology(options.host, hba[1], fab)
-    line = "Application,{0}".format(options.newname)
+        hbas = GetHostHBAs(vw, [entity.strip() for entity in options.hostlist.split(",")], catalogue, options.workers)
+    fabrics.Prefetch([hba[1] for hba in hbas])
+
+    with ThreadPoolExecutor(max_workers=options.workers) as pool:
+        topo = dict(zip(hbas, pool.map(lambda hba: GetTopology(vw, hba[1], fabrics.Get(hba[1]), fabrics), hbas)))
+    if options.json:
+        document = ImportDocument(options.newname, topo)
+        if options.output != None:
+            with open(options.output, 'w') as output:
+                output.writelines(document)
+            if options.upload:
+                EntityImport.UploadEntityImport(vw, fh=open(options.output, 'rb'))
+        elif options.upload:
+            EntityImport.UploadEntityImport(vw, fh=(piece.encode('utf-8') for piece in document))
+        else:
+            sys.stdout.writelines(document)
+        if options.upload:
+            print("Successfully Imported!")
+        return
+
+    # output will go to a text file or to stdout if no file is specified
+    if options.output != None:
+        output = open(options.output, 'w')
+    else:
+        output = sys.stdout
+
+    output.write("Application,{0}".format(options.newname))
     for hba in topo:
         for targ in topo[hba]:
-            line += ",{0}:{1}".format(hba[0], targ)
-    print(line)
+            output.write(",{0}:{1}".format(hba[0], targ))
+    output.write("\n")
 
-    print("\n")
+    if options.output != None:
+        output.close()
+    else:
+        print("\n")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
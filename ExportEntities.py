@@ -6,17 +6,13 @@ __copyright__ = 'Copyright (c) 2015 Virtual Instruments Corporation. All rights
 __date__ = '2015-02-22'
 __version__ = '1.0'
 
-# requires python requests module by Kenneth Reitz
-# http://docs.python-requests.org/en/latest/
-# git clone git://github.com/kennethreitz/requests.git
-# pip3 install requests
-import requests
-import json
+# requires VirtualWisdom.py from this repository and the python requests module
+import VirtualWisdom
+import EntityCatalogue
 import sys, os, optparse
-
-jsonheaders = {'content-type': 'application/json'}
-requests.packages.urllib3.disable_warnings()
-s = requests.session()
+import itertools
+import csv, threading
+from concurrent.futures import ThreadPoolExecutor
 
 def ParseCmdLineParameters():
     opts = optparse.OptionParser(description='Upload a JSON Entity Import File to VirtualWisdom.')
@@ -29,6 +25,14 @@ def ParseCmdLineParameters():
     opts.add_option("-t", "--entitytype", action="store", type="string", dest="entitytype")
     opts.add_option("-s", "--properties", action="store_true", dest="properties", default=False)
     opts.add_option("-x", "--exactonly", action="store_true", dest="exactonly", default=False)
+    opts.add_option("-l", "--itloutput", action="store", type="string", dest="itloutput")
+    opts.add_option("-b", "--batchsize", action="store", type="int", dest="batchsize", default=VirtualWisdom.defaultbatchsize)
+    opts.add_option("-g", "--pagesize", action="store", type="int", dest="pagesize", default=VirtualWisdom.defaultpagesize)
+    opts.add_option("-w", "--workers", action="store", type="int", dest="workers", default=1)
+    opts.add_option("-c", "--catalogue", action="store", type="string", dest="catalogue")
+    opts.add_option("--stream", action="store_true", dest="stream", default=False)
+    opts.add_option("-m", "--metrics", action="store", type="string", dest="metrics")
+    opts.add_option("--no-session-cache", action="store_true", dest="nosessioncache", default=False)
     opt, argv = opts.parse_args()
 
     if opt.host == None or opt.username == None or (opt.password == None and opt.passwordfile == None) or (opt.entity == None and opt.entitytype == None):
@@ -39,6 +43,19 @@ def ParseCmdLineParameters():
         if not os.path.exists(opt.passwordfile):
             PrintHelpAndExit("Specified password file does not exist.")
 
+    if opt.catalogue != None:
+        if not os.path.exists(opt.catalogue):
+            PrintHelpAndExit("Specified catalogue file does not exist.")
+
+    if opt.batchsize < 1:
+        PrintHelpAndExit("Batch size must be at least 1.")
+
+    if opt.pagesize < 1:
+        PrintHelpAndExit("Page size must be at least 1.")
+
+    if opt.workers < 1:
+        PrintHelpAndExit("Number of workers must be at least 1.")
+
     return opt
 
 
@@ -48,112 +65,154 @@ def PrintHelpAndExit(errormessage=""):
     print("\n\nUsage:\n\tEntityExport -v <VW Appliance IP> -u <Username> -p <Password> -e <Entity Name>\n\n\tEntityImport -v <VW Appliance IP> -u <Username> -z <PasswordFile> -t <Entity Type>>\n\n\t\techo 'admin' > pwfile\n\t\tchmod 600 pwfile\n\t\tpython3 EntityExport.py -v 10.20.30.40 -u Administrator -z pwfile -t Application\n\n")
     exit()
 
-# logs into VirtualWisdom using the provided credentials
-# on the global session
-def VirtualWisdomLogin(ipaddr, login, password):
-    loginpayload = {'username': login, 'password': password, 'targetRoute': None}
+# logs into VirtualWisdom using the provided credentials, reusing a cached session
+# unless sessioncache is None, and returns the client holding the session
+def VirtualWisdomLogin(ipaddr, login, password, sessioncache=VirtualWisdom.defaultsessioncache, poolsize=VirtualWisdom.defaultpoolsize, metrics=None):
+    vw = VirtualWisdom.VirtualWisdomClient(ipaddr, poolsize=poolsize, metrics=metrics)
     try:
-        # undocumented and unsupported apis, subject to change in every release
-        r = s.post('https://{0}/api/sec/login'.format(ipaddr), verify=False, data=loginpayload)
-        if r.status_code == 200:
-            # undocumented and unsupported apis, subject to change in every release
-            r = s.get('https://{0}/api/sec/session'.format(ipaddr), verify=False)
-            if r.json()['status'] == "OK":
-                return
-            else:
-                PrintHelpAndExit("Logged into VirtualWisdom but session check was unsuccessful.")
-        else:
-            PrintHelpAndExit("Unable to connect to VirtualWisdom with provided information.")
-    except:
-        PrintHelpAndExit("Exception caught in the VirtualWisdom login process.")
-
-def EntityExport(ipaddr, entity):
+        vw.Login(login, password, sessioncache)
+    except VirtualWisdom.VirtualWisdomError as e:
+        PrintHelpAndExit(str(e))
+    return vw
+
+# returns the (initiator, target, lun) of an application itl, blank or -1 meaning All
+def FormatITL(i):
+    init = i['initiatorLabel'] if i['initiatorLabel'] != '' else 'All' 
+    targ = i['targetLabel'] if i['targetLabel'] != '' else 'All'
+    lun = i['lun'] if i['lun'] != -1 else 'All' 
+    return (init, targ, lun)
+
+# if itls is False application rows are returned without their itls, see ExportITLs
+def EntityExport(vw, entity, workers=1, itls=True, pagesize=VirtualWisdom.defaultpagesize, catalogue=None):
     #try:
-    # undocumented and unsupported apis, subject to change in every release
     entitylist = []
-    for entitytype in ('Application', 'Host', 'HBA', 'HostPort', 'ESXCluster', 'ESXHost', 'VirtualMachine', 'StorageArray', 'StorageController', 'IOModule', 'StoragePort'):
-        r = s.get('https://{0}/api/entitymgmt/entities?filter={1}&filterKeys=DisplayLabel%2CTags&filterValues={1}&type={2}&page=1&start=0&limit=500000'.format(ipaddr, entity, entitytype), verify=False)
-        if r.status_code == 200 and r.json()['status'] == "OK":
-            for e in r.json()['result']['data']:
-                if e['Type'] == 'Application':
-                    itls = []
-                    r2 = s.get('https://{0}/api/entitymgmt/app/{1}/itls?filterKeys=initiatorLabel&filterKeys=targetLabel&page=1&start=0&limit=500000'.format(ipaddr, e['Id']), verify=False)
-                    if r2.status_code == 200 and r2.json()['status'] == "OK":
-                        for i in r2.json()['result']['data']:
-                            init = i['initiatorLabel'] if i['initiatorLabel'] != '' else 'All' 
-                            targ = i['targetLabel'] if i['targetLabel'] != '' else 'All'
-                            lun = i['lun'] if i['lun'] != -1 else 'All' 
-                            itls.append((init, targ, lun))
-                    entitylist.append((e['DisplayLabel'], e['Type'], e['Tags'], e['Description'], e['BeginTime'], e['Id'], itls))
-                elif e['Type'] == 'HostPort' or e['Type'] == 'StoragePort':
-                    entitylist.append((e['DisplayLabel'], e['Type'], e['Tags'], e['Description'], e['WWN'], e['BeginTime'], e['Id']))
-                else:
-                    entitylist.append((e['DisplayLabel'], e['Type'], e['Tags'], e['Description'], e['BeginTime'], e['Id']))
+    found = catalogue.Search(entity) if catalogue != None else []
+    # the per-type searches run concurrently, results come back in entity type order
+    for e in found or vw.SearchEntities(entity, workers):
+        if e['Type'] == 'Application' and itls:
+            entitylist.append((e['DisplayLabel'], e['Type'], e['Tags'], e['Description'], e['BeginTime'], e['Id'], [FormatITL(i) for i in vw.IterApplicationITLs(e['Id'], pagesize)]))
+        elif e['Type'] == 'HostPort' or e['Type'] == 'StoragePort':
+            entitylist.append((e['DisplayLabel'], e['Type'], e['Tags'], e['Description'], e['WWN'], e['BeginTime'], e['Id']))
+        else:
+            entitylist.append((e['DisplayLabel'], e['Type'], e['Tags'], e['Description'], e['BeginTime'], e['Id']))
 
     return entitylist
     #except:
     #    PrintHelpAndExit("Exception caught during Entity Import.")
 
-def EntityTypeExport(ipaddr, entitytype):
+# yields entities one page at a time so that memory use does not depend on how many
+# entities of the type exist, rows are written out as each page arrives
+def EntityTypeExport(vw, entitytype, pagesize=VirtualWisdom.defaultpagesize):
     #try:
-    # undocumented and unsupported apis, subject to change in every release
-    r = s.get('https://{0}/api/entitymgmt/entities?filter=&filterKeys=DisplayLabel%2CTags&filterValues=&type={1}&page=1&start=0&limit=500000'.format(ipaddr, entitytype), verify=False)
-    if r.status_code == 200 and r.json()['status'] == "OK":
-        entitylist = []
-        for entity in r.json()['result']['data']:
-            if entity['Type'] == "HostPort" or entity['Type'] == "StoragePort":
-                entitylist.append((entity['DisplayLabel'], entity['Type'], entity['Tags'], entity['Description'], entity['WWN'], entity['BeginTime'], entity['Id']))
-            else:
-                entitylist.append((entity['DisplayLabel'], entity['Type'], entity['Tags'], entity['Description'], entity['BeginTime'], entity['Id']))
-        return entitylist
-
-    else:
-        return []
+    for entity in vw.IterEntities(entitytype, pagesize=pagesize):
+        if entity['Type'] == "HostPort" or entity['Type'] == "StoragePort":
+            yield (entity['DisplayLabel'], entity['Type'], entity['Tags'], entity['Description'], entity['WWN'], entity['BeginTime'], entity['Id'])
+        else:
+            yield (entity['DisplayLabel'], entity['Type'], entity['Tags'], entity['Description'], entity['BeginTime'], entity['Id'])
     #except:
     #    PrintHelpAndExit("Exception caught during Entity Import.")
 
-def GetProperties(ipaddr, entityid):
-    r = s.get('https://{0}/api/entitymgmt/entity/properties?ids={1}&withArchived=false'.format(ipaddr, entityid), verify=False)
-    if r.status_code == 200 and r.json()['status'] == "OK":
-        return r.json()['result']
+# returns the entity id from an exported entity row
+def RowId(row):
+    if row[1] == 'HostPort' or row[1] == 'StoragePort':
+        return row[6]
+    return row[5]
+
+# pairs each row with its properties, looking them up batchsize ids per request with up to
+# workers requests in flight, rows are consumed and yielded a window at a time to keep streaming
+def AddProperties(vw, rows, batchsize=VirtualWisdom.defaultbatchsize, workers=1):
+    rows = iter(rows)
+    while True:
+        window = list(itertools.islice(rows, batchsize * workers))
+        if len(window) == 0:
+            return
+        properties = vw.GetPropertiesById([RowId(row) for row in window], batchsize, workers)
+        for row in window:
+            # same shape as the single entity properties response
+            yield (row, [properties[RowId(row)]] if RowId(row) in properties else None)
+
+# passes rows straight through while writing the itls of every application row to a csv as
+# app id,initiator,target,lun, paging through each application's itls with up to workers
+# applications fetched at once, each row is written as its page arrives
+def ExportITLs(vw, rows, itloutput, pagesize=VirtualWisdom.defaultpagesize, workers=1):
+    writer = csv.writer(itloutput)
+    lock = threading.Lock()
+    def WriteITLs(appid):
+        for i in vw.IterApplicationITLs(appid, pagesize):
+            with lock:
+                writer.writerow((appid,) + FormatITL(i))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for row in rows:
+            if row[1] == 'Application':
+                futures.append(pool.submit(WriteITLs, RowId(row)))
+            yield row
+        for future in futures:
+            future.result()
 
 def main():
     options = ParseCmdLineParameters()
 
+    # request metrics are written to the metrics file when the tool exits
+    metrics = VirtualWisdom.RequestMetrics(options.metrics) if options.metrics != None else None
+    sessioncache = None if options.nosessioncache else VirtualWisdom.defaultsessioncache
+
     # if the user specified a password use it, otherwise read from the provided password file
     if options.password != None:
-        VirtualWisdomLogin(options.host, options.username, options.password)
+        vw = VirtualWisdomLogin(options.host, options.username, options.password, sessioncache, max(options.workers, VirtualWisdom.defaultpoolsize), metrics)
     else:
-        VirtualWisdomLogin(options.host, options.username, open(options.passwordfile,'r').readline().strip())
+        vw = VirtualWisdomLogin(options.host, options.username, open(options.passwordfile,'r').readline().strip(), sessioncache, max(options.workers, VirtualWisdom.defaultpoolsize), metrics)
+    vw.stream = options.stream
+
+    # names are looked up in the local entity catalogue first when one is given
+    catalogue = EntityCatalogue.EntityCatalogue(options.catalogue) if options.catalogue != None else None
 
     # if the user specified an entity file, use it otherwise read from standard input
     if options.entity != None:
-        entities = EntityExport(options.host, options.entity)
+        entities = EntityExport(vw, options.entity, options.workers, options.itloutput == None, options.pagesize, catalogue)
+    else:
+        entities = EntityTypeExport(vw, options.entitytype, options.pagesize)
+
+    # output will go to a text file or to stdout if no file is specified
+    if options.output != None:
+        output = open(options.output, 'w')
     else:
-        entities = EntityTypeExport(options.host, options.entitytype)
-    
+        output = sys.stdout
+
     if options.entity != None:
         if options.exactonly:
-            print("\nExact Matches:")
-            for e in entities:
-                if e[0] == options.entity:
-                    print(e)
-                    if options.properties:
-                        print(GetProperties(options.host, e[5]))
+            print("\nExact Matches:", file=output)
+            entities = (e for e in entities if e[0] == options.entity)
         else:
-            print("\nAll Matches:")
-            for e in entities:
-                print(e)
-                if options.properties:
-                    print(GetProperties(options.host, e[5]))
+            print("\nAll Matches:", file=output)
     else:
-        print("\n{0} Entities:".format(options.entitytype))
-        for e in entities:
-            print(e)
-            if options.properties:
-                print(GetProperties(options.host, e[5]))
+        print("\n{0} Entities:".format(options.entitytype), file=output)
+
+    # application itls go to their own csv rather than being nested in the application row,
+    # only for the rows that are printed so -x leaves out the partial matches' itls
+    if options.itloutput != None:
+        itloutput = open(options.itloutput, 'w', newline='')
+        entities = ExportITLs(vw, entities, itloutput, options.pagesize, options.workers)
 
-    print("\n")
+    # a page that fails part way through the export stops it with an error rather than leaving
+    # output that looks complete
+    try:
+        if options.properties:
+            for e, properties in AddProperties(vw, entities, options.batchsize, options.workers):
+                print(e, file=output)
+                print(properties, file=output)
+        else:
+            for e in entities:
+                print(e, file=output)
+    except VirtualWisdom.VirtualWisdomError as e:
+        print("\n\nExport incomplete.  " + str(e), file=sys.stderr)
+        sys.exit(1)
+
+    print("\n", file=output)
+    if options.output != None:
+        output.close()
+    if options.itloutput != None:
+        itloutput.close()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+
+__author__ = 'nick.york'
+__license__ = 'https://www.apache.org/licenses/LICENSE-2.0'
+__copyright__ = 'Copyright (c) 2015 Virtual Instruments Corporation. All rights reserved.'
+__date__ = '2026-10-18'
+__version__ = '1.0'
+
+# incremental json decoding, used to process large VirtualWisdom responses and entity import
+# files item by item as they are read instead of decoding the whole document first
+
+import json
+import codecs
+import random
+import sys
+
+whitespace = ' \t\n\r'
+
+class JSONStreamParser:
+    # path is the list of object keys leading to the array or object whose items are wanted,
+    # eg ('result', 'data'), array items are returned as values and object items as (key, value)
+    # if more than one path is given each item is returned as (path, item)
+    # scalar values met elsewhere in the document are kept in scalars, keyed by their key path
+    def __init__(self, *paths):
+        self.paths = [tuple(path) for path in paths]
+        self.keys = []
+        self.state = 'value'
+        self.buffer = ''
+        self.pos = 0
+        self.closed = False
+        self.waitfor = 0
+        self.itempath = None
+        self.itemcount = 0
+        self.scalars = {}
+        self.decoder = json.JSONDecoder()
+        self.bytedecoder = codecs.getincrementaldecoder('utf-8')()
+
+    # adds the next chunk of the document, returns the list of items completed by it
+    def Feed(self, chunk):
+        if isinstance(chunk, bytes):
+            chunk = self.bytedecoder.decode(chunk)
+        self.buffer += chunk
+        # after running out of data part way through a value, wait until the buffer has grown
+        # enough to make another attempt worthwhile rather than re-scanning it on every chunk
+        if len(self.buffer) - self.pos < self.waitfor:
+            return []
+        return self.Parse()
+
+    # call once the whole document has been fed, returns any items still pending
+    def Close(self):
+        self.buffer += self.bytedecoder.decode(b'', final=True)
+        self.closed = True
+        items = self.Parse()
+        if self.state != 'done':
+            raise ValueError("Incomplete JSON document, expecting {0} at character {1}.".format(self.state, self.pos))
+        return items
+
+    # yields the items of a document read from an iterable of str or bytes chunks
+    def Iterate(self, chunks):
+        for chunk in chunks:
+            for item in self.Feed(chunk):
+                yield item
+        for item in self.Close():
+            yield item
+
+    def SkipWhitespace(self):
+        while self.pos < len(self.buffer) and self.buffer[self.pos] in whitespace:
+            self.pos += 1
+        return self.pos < len(self.buffer)
+
+    # decodes one complete value at the current position or returns (False, None) if more data
+    # is needed, a value running right up to the end of the buffer may be a truncated number and
+    # so may a number followed by the start of a fraction or exponent, eg 1. waiting for its 5
+    def DecodeValue(self):
+        try:
+            value, end = self.decoder.raw_decode(self.buffer, self.pos)
+        except ValueError:
+            if self.closed:
+                raise
+            return (False, None)
+        if not self.closed:
+            if end == len(self.buffer):
+                return (False, None)
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and self.buffer[end] in '.eE+-':
+                return (False, None)
+        self.pos = end
+        return (True, value)
+
+    def Expect(self, char):
+        if self.buffer[self.pos] != char:
+            raise ValueError("Expecting '{0}' at character {1}.".format(char, self.pos))
+        self.pos += 1
+
+    # a value at the current key path has been completely read
+    def EndValue(self):
+        if len(self.keys) == 0:
+            self.state = 'done'
+        else:
+            self.keys.pop()
+            self.state = 'comma'
+
+    def Parse(self):
+        items = []
+        self.waitfor = 0
+        while self.state != 'done' and self.SkipWhitespace():
+            mark = self.pos
+            char = self.buffer[self.pos]
+            keypath = tuple(self.keys)
+            if self.state == 'value':
+                if keypath in self.paths and char in '[{':
+                    self.pos += 1
+                    self.container = char
+                    self.itempath = keypath
+                    self.itemcount = 0
+                    self.state = 'items'
+                elif any(keypath == path[:len(keypath)] for path in self.paths) and char == '{':
+                    self.pos += 1
+                    self.state = 'key'
+                else:
+                    complete, value = self.DecodeValue()
+                    if not complete:
+                        break
+                    if not isinstance(value, (dict, list)):
+                        self.scalars[keypath] = value
+                    self.EndValue()
+            elif self.state == 'key':
+                if char == '}':
+                    self.pos += 1
+                    self.EndValue()
+                    continue
+                complete, key = self.DecodeValue()
+                if not complete:
+                    break
+                self.keys.append(key)
+                self.state = 'colon'
+            elif self.state == 'colon':
+                self.Expect(':')
+                self.state = 'value'
+            elif self.state == 'comma':
+                self.pos += 1
+                if char == ',':
+                    self.state = 'key'
+                elif char == '}':
+                    self.EndValue()
+                else:
+                    raise ValueError("Expecting ',' or '}}' at character {0}.".format(mark))
+            elif self.state == 'items':
+                if char == (']' if self.container == '[' else '}'):
+                    self.pos += 1
+                    self.EndValue()
+                    continue
+                if self.itemcount > 0:
+                    self.Expect(',')
+                    if not self.SkipWhitespace():
+                        self.pos = mark
+                        break
+                if self.container == '[':
+                    complete, item = self.DecodeValue()
+                else:
+                    complete, item = self.DecodeMember()
+                if not complete:
+                    self.pos = mark
+                    break
+                self.itemcount += 1
+                items.append(item if len(self.paths) == 1 else (self.itempath, item))
+        if self.state != 'done' and self.pos < len(self.buffer) and not self.closed:
+            self.waitfor = (len(self.buffer) - self.pos) * 2
+        # drop everything already consumed so memory is bounded by the largest single item
+        self.buffer = self.buffer[self.pos:]
+        self.pos = 0
+        return items
+
+    # decodes one "key": value member of the wanted object
+    def DecodeMember(self):
+        complete, key = self.DecodeValue()
+        if not complete or not self.SkipWhitespace():
+            return (False, None)
+        self.Expect(':')
+        if not self.SkipWhitespace():
+            return (False, None)
+        complete, value = self.DecodeValue()
+        if not complete:
+            return (False, None)
+        return (True, (key, value))
+
+# a chunk boundary fuzz check of the parser against json.loads, run as python3 JSONStream.py
+# [<Documents>], each random document is fed split at random points and at every single point
+def RandomValue(rnd, depth=0):
+    r = rnd.random()
+    if depth > 2 or r < 0.5:
+        return rnd.choice([rnd.randint(-10**6, 10**6), rnd.uniform(-1e6, 1e6), rnd.uniform(-1, 1) * 10**rnd.randint(-30, 30), True, False, None, 'a "quoted" é string'])
+    if r < 0.75:
+        return [RandomValue(rnd, depth + 1) for i in range(rnd.randint(0, 4))]
+    return dict(('key{0}'.format(i), RandomValue(rnd, depth + 1)) for i in range(rnd.randint(0, 4)))
+
+def FuzzCheck(documents=1000, seed=0):
+    rnd = random.Random(seed)
+    for n in range(documents):
+        document = {'status': 'OK', 'count': RandomValue(rnd, 3), 'result': {'data': [RandomValue(rnd) for i in range(rnd.randint(0, 8))]}}
+        raw = json.dumps(document, indent=rnd.choice([None, 1])).encode('utf-8')
+        expected = json.loads(raw.decode('utf-8'))
+        cuts = sorted(rnd.sample(range(1, len(raw)), min(len(raw) - 1, rnd.randint(1, 40))))
+        splits = [[raw[a:b] for a, b in zip([0] + cuts, cuts + [len(raw)])]]
+        if n < documents // 10:
+            splits += [[raw[:c], raw[c:]] for c in range(1, len(raw))]
+        for chunks in splits:
+            parser = JSONStreamParser(('result', 'data'))
+            items = list(parser.Iterate(chunks))
+            if items != expected['result']['data'] or parser.scalars.get(('count',)) != expected['count']:
+                raise AssertionError("Parsed items differ from json.loads for {0!r} split as {1!r}.".format(raw, chunks))
+    print("{0} documents parsed the same as json.loads at every chunk boundary tried.".format(documents))
+
+if __name__ == '__main__':
+    FuzzCheck(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -6,17 +6,12 @@ __copyright__ = 'Copyright (c) 2015 Virtual Instruments Corporation. All rights
 __date__ = '2015-02-22'
 __version__ = '1.0'
 
-# requires python requests module by Kenneth Reitz
-# http://docs.python-requests.org/en/latest/
-# git clone git://github.com/kennethreitz/requests.git
-# pip3 install requests
-import requests
-import json
+# requires VirtualWisdom.py from this repository and the python requests module
+import VirtualWisdom
+import EntityCatalogue
 import sys, os, optparse
-
-jsonheaders = {'content-type': 'application/json'}
-requests.packages.urllib3.disable_warnings()
-s = requests.session()
+import csv
+from concurrent.futures import ThreadPoolExecutor
 
 def ParseCmdLineParameters():
     opts = optparse.OptionParser(description='Upload a JSON Entity Import File to VirtualWisdom.')
@@ -26,113 +21,169 @@ def ParseCmdLineParameters():
     opts.add_option("-z", "--password-file", action="store", type="string", dest="passwordfile")
     opts.add_option("-o", "--output", action="store", type="string", dest="output")
     opts.add_option("-e", "--entity", action="store", type="string", dest="entity")
+    opts.add_option("-f", "--entityfile", action="store", type="string", dest="entityfile")
+    opts.add_option("-g", "--pagesize", action="store", type="int", dest="pagesize", default=VirtualWisdom.defaultpagesize)
+    opts.add_option("-b", "--batchsize", action="store", type="int", dest="batchsize", default=VirtualWisdom.defaultbatchsize)
+    opts.add_option("-w", "--workers", action="store", type="int", dest="workers", default=1)
+    opts.add_option("-c", "--catalogue", action="store", type="string", dest="catalogue")
+    opts.add_option("--stream", action="store_true", dest="stream", default=False)
+    opts.add_option("-m", "--metrics", action="store", type="string", dest="metrics")
+    opts.add_option("--no-session-cache", action="store_true", dest="nosessioncache", default=False)
     opt, argv = opts.parse_args()
 
-    if opt.host == None or opt.username == None or (opt.password == None and opt.passwordfile == None) or opt.entity == None:
-        PrintHelpAndExit("You must specify the VirtualWisdom host, username, password or password file and entity.")
+    if opt.host == None or opt.username == None or (opt.password == None and opt.passwordfile == None) or (opt.entity == None and opt.entityfile == None):
+        PrintHelpAndExit("You must specify the VirtualWisdom host, username, password or password file and entity or entity file.")
         exit()
 
     if opt.passwordfile != None:
         if not os.path.exists(opt.passwordfile):
             PrintHelpAndExit("Specified password file does not exist.")
 
+    if opt.catalogue != None:
+        if not os.path.exists(opt.catalogue):
+            PrintHelpAndExit("Specified catalogue file does not exist.")
+
+    if opt.entityfile != None:
+        if not os.path.exists(opt.entityfile):
+            PrintHelpAndExit("Specified entity file does not exist.")
+
+    if opt.pagesize < 1:
+        PrintHelpAndExit("Page size must be at least 1.")
+
+    if opt.batchsize < 1:
+        PrintHelpAndExit("Batch size must be at least 1.")
+
+    if opt.workers < 1:
+        PrintHelpAndExit("Number of workers must be at least 1.")
+
     return opt
 
 
 def PrintHelpAndExit(errormessage=""):
     if (errormessage != ""):
         print("\n\n" + errormessage)
-    print("\n\nUsage:\n\tShowTopology.py -v <VW Appliance IP> -u <Username> -p <Password> -e <Entity Name>\n\n")
+    print("\n\nUsage:\n\tShowTopology.py -v <VW Appliance IP> -u <Username> -p <Password> -e <Entity Name>[,<Entity Name>]\n\n\tShowTopology.py -v <VW Appliance IP> -u <Username> -p <Password> -f <File of Entity Names> -o <Output CSV>\n\n")
     exit()
 
-# logs into VirtualWisdom using the provided credentials
-# on the global session
-def VirtualWisdomLogin(ipaddr, login, password):
-    loginpayload = {'username': login, 'password': password, 'targetRoute': None}
+# logs into VirtualWisdom using the provided credentials, reusing a cached session
+# unless sessioncache is None, and returns the client holding the session
+def VirtualWisdomLogin(ipaddr, login, password, sessioncache=VirtualWisdom.defaultsessioncache, poolsize=VirtualWisdom.defaultpoolsize, metrics=None):
+    vw = VirtualWisdom.VirtualWisdomClient(ipaddr, poolsize=poolsize, metrics=metrics)
     try:
-        # undocumented and unsupported apis, subject to change in every release
-        r = s.post('https://{0}/api/sec/login'.format(ipaddr), verify=False, data=loginpayload)
-        if r.status_code == 200:
-            # undocumented and unsupported apis, subject to change in every release
-            r = s.get('https://{0}/api/sec/session'.format(ipaddr), verify=False)
-            if r.json()['status'] == "OK":
-                return
-            else:
-                PrintHelpAndExit("Logged into VirtualWisdom but session check was unsuccessful.")
-        else:
-            PrintHelpAndExit("Unable to connect to VirtualWisdom with provided information.")
-    except:
-        PrintHelpAndExit("Exception caught in the VirtualWisdom login process.")
+        vw.Login(login, password, sessioncache)
+    except VirtualWisdom.VirtualWisdomError as e:
+        PrintHelpAndExit(str(e))
+    return vw
 
-def GetEntityId(ipaddr, entity):
+def GetEntityId(vw, entity, workers=1, catalogue=None):
     entitylist = []
-    for entitytype in ('Application', 'Host', 'HBA', 'HostPort', 'ESXCluster', 'ESXHost', 'VirtualMachine', 'StorageArray', 'StorageController', 'IOModule', 'StoragePort'):
-        # undocumented and unsupported apis, subject to change in every release
-        r = s.get('https://{0}/api/entitymgmt/entities?filter={1}&filterKeys=DisplayLabel%2CTags&filterValues={1}&type={2}&page=1&start=0&limit=500000'.format(ipaddr, entity, entitytype), verify=False)
-        if r.status_code == 200 and r.json()['status'] == "OK":
-            for e in r.json()['result']['data']:
-                if e['DisplayLabel'] == entity:
-                    entitylist.append((e['Name'], e['Id'], e['Type']))
+    found = catalogue.Lookup(entity) if catalogue != None else []
+    # the per-type searches run concurrently, results come back in entity type order
+    for e in found or vw.SearchEntities(entity, workers):
+        if e['DisplayLabel'] == entity:
+            entitylist.append((e['Name'], e['Id'], e['Type']))
 
     return entitylist
 
-def GetTopology(ipaddr, entityid, entitytype):
+# resolves many entity names in one pass, reading each entity type's full list once (up to
+# workers types at a time) rather than searching per name, returns a dict of name to the
+# matching (Name, Id, Type) in entity type order
+# names found in the catalogue, if one is given, are not looked up on the appliance
+def GetEntityIds(vw, entities, workers=1, pagesize=VirtualWisdom.defaultpagesize, catalogue=None):
+    entityids = dict((entity, []) for entity in entities)
+    if catalogue != None:
+        for entity in entities:
+            entityids[entity] = [(e['Name'], e['Id'], e['Type']) for e in catalogue.Lookup(entity)]
+    wanted = set(entity for entity in entities if len(entityids[entity]) == 0)
+    if len(wanted) == 0:
+        return entityids
+    def Matches(entitytype):
+        return [(e['DisplayLabel'], (e['Name'], e['Id'], e['Type'])) for e in vw.IterEntities(entitytype, pagesize=pagesize) if e['DisplayLabel'] in wanted]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for matches in pool.map(Matches, VirtualWisdom.entitytypes):
+            for entity, entityid in matches:
+                entityids[entity].append(entityid)
+    return entityids
+
+def GetTopology(vw, entityid, entitytype, batchsize=VirtualWisdom.defaultbatchsize, workers=1):
     if entitytype.startswith("Storage"):
         payload = {"appId":"-1","hostFilter":{"type":"HostPort"},"storageFilter":{"type":"StoragePort","entityIds":[entityid]},"hostEdgeFilter":{"type":"LogicalSwitch"},"storageEdgeFilter":{"type":"LogicalSwitch"}}
     else:
         payload = {"appId":"-1","hostFilter":{"type":"HostPort","entityIds":[entityid]},"storageFilter":{"type":"StoragePort"},"hostEdgeFilter":{"type":"LogicalSwitch"},"storageEdgeFilter":{"type":"LogicalSwitch"}}
-    # undocumented and unsupported apis, subject to change in every release
-    r = s.put('https://{0}/api/topo/filter4/graph'.format(ipaddr), data=json.dumps(payload), headers=jsonheaders, verify=False)
+    graph = vw.GetTopologyGraph(payload)
+
+    # the members of every collapsed blob on either side are resolved together in batches
+    children = vw.GetEntitiesById([child for childids in graph.blobs.values() for child in childids], batchsize, workers)
+
     hbas = []
     switches = []
     storageports = []
-    if r.status_code == 200 and r.json()['status'] == "OK":
-        for node in r.json()['result']['nodes']:
-            if 'DeviceType' in r.json()['result']['nodes'][node] and r.json()['result']['nodes'][node]['DeviceType'] == 'SERVER':
-                if 'IsBlob' in r.json()['result']['nodes'][node] and r.json()['result']['nodes'][node]['IsBlob'] == True:
-                    childlist = []
-                    for child in r.json()['result']['nodes'][node]['ChildIds']:
-                        childlist.append(child)
-                    r2 = s.post('https://{0}/api/entitymgmt/entities/idlist'.format(ipaddr), data=json.dumps(childlist), headers=jsonheaders, verify=False)
-                    if r2.status_code == 200 and r2.json()['status'] == "OK":
-                        for item in r2.json()['result']['data']:
-                            hbas.append(item['DisplayLabel'])
-                else:
-                    hbas.append(r.json()['result']['nodes'][node]['DisplayLabel'])
-            elif 'DeviceType' in r.json()['result']['nodes'][node] and r.json()['result']['nodes'][node]['DeviceType'] == 'STORAGE':
-                if 'IsBlob' in r.json()['result']['nodes'][node] and r.json()['result']['nodes'][node]['IsBlob'] == True:
-                    childlist = []
-                    for child in r.json()['result']['nodes'][node]['ChildIds']:
-                        childlist.append(child)
-                    r2 = s.post('https://{0}/api/entitymgmt/entities/idlist'.format(ipaddr), data=json.dumps(childlist), headers=jsonheaders, verify=False)
-                    if r2.status_code == 200 and r2.json()['status'] == "OK":
-                        for item in r2.json()['result']['data']:
-                            storageports.append(item['DisplayLabel'])
-                else:
-                    storageports.append(r.json()['result']['nodes'][node]['DisplayLabel'])
-            else:
-                switches.append(r.json()['result']['nodes'][node]['DisplayLabel'])
+    for node in graph.Nodes('SERVER'):
+        if graph.IsBlob(node):
+            hbas.extend(children[child]['DisplayLabel'] for child in node['ChildIds'] if child in children)
+        else:
+            hbas.append(node['DisplayLabel'])
+    for node in graph.Nodes('STORAGE'):
+        if graph.IsBlob(node):
+            storageports.extend(children[child]['DisplayLabel'] for child in node['ChildIds'] if child in children)
+        else:
+            storageports.append(node['DisplayLabel'])
+    for node in graph.Switches():
+        switches.append(node['DisplayLabel'])
 
     return (hbas, switches, storageports)
 
 def main():
     options = ParseCmdLineParameters()
 
+    # request metrics are written to the metrics file when the tool exits
+    metrics = VirtualWisdom.RequestMetrics(options.metrics) if options.metrics != None else None
+    sessioncache = None if options.nosessioncache else VirtualWisdom.defaultsessioncache
+
     # if the user specified a password use it, otherwise read from the provided password file
     if options.password != None:
-        VirtualWisdomLogin(options.host, options.username, options.password)
+        vw = VirtualWisdomLogin(options.host, options.username, options.password, sessioncache, max(options.workers, VirtualWisdom.defaultpoolsize), metrics)
     else:
-        VirtualWisdomLogin(options.host, options.username, open(options.passwordfile,'r').readline().strip())
-
-    entities = GetEntityId(options.host, options.entity)
-    for entityid in entities:
-        topo = GetTopology(options.host, entityid[1], entityid[2])
-        print("\n\nTopology for: {0}\n".format(entityid[0]))
-        print("Host Ports: {0}".format(', '.join(topo[0])))
-        print("Switches: {0}".format(', '.join(topo[1])))
-        print("Storage Ports: {0}".format(', '.join(topo[2])))
+        vw = VirtualWisdomLogin(options.host, options.username, open(options.passwordfile,'r').readline().strip(), sessioncache, max(options.workers, VirtualWisdom.defaultpoolsize), metrics)
+    vw.stream = options.stream
+
+    # names are looked up in the local entity catalogue first when one is given
+    catalogue = EntityCatalogue.EntityCatalogue(options.catalogue) if options.catalogue != None else None
+
+    # names come from the comma separated -e list and/or one per line from the -f file
+    names = []
+    if options.entity != None:
+        names.extend(name.strip() for name in options.entity.split(","))
+    if options.entityfile != None:
+        names.extend(line.strip() for line in open(options.entityfile, 'r'))
+    names = [name for name in dict.fromkeys(names) if name != '']
+
+    if len(names) == 1:
+        entities = GetEntityId(vw, names[0], options.workers, catalogue)
+    else:
+        entityids = GetEntityIds(vw, names, options.workers, options.pagesize, catalogue)
+        entities = [entityid for name in names for entityid in entityids[name]]
+
+    # the topology queries run concurrently, results are kept in entity order
+    with ThreadPoolExecutor(max_workers=options.workers) as pool:
+        topos = list(pool.map(lambda entityid: GetTopology(vw, entityid[1], entityid[2], options.batchsize, options.workers), entities))
+
+    if options.output != None:
+        with open(options.output, 'w', newline='') as output:
+            writer = csv.writer(output)
+            writer.writerow(('Entity', 'Id', 'Type', 'Role', 'Label'))
+            for entityid, topo in zip(entities, topos):
+                for role, labels in zip(('HostPort', 'Switch', 'StoragePort'), topo):
+                    for label in labels:
+                        writer.writerow((entityid[0], entityid[1], entityid[2], role, label))
+    else:
+        for entityid, topo in zip(entities, topos):
+            print("\n\nTopology for: {0}\n".format(entityid[0]))
+            print("Host Ports: {0}".format(', '.join(topo[0])))
+            print("Switches: {0}".format(', '.join(topo[1])))
+            print("Storage Ports: {0}".format(', '.join(topo[2])))
 
-    print("\n")
+        print("\n")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+
+__author__ = 'nick.york'
+__license__ = 'https://www.apache.org/licenses/LICENSE-2.0'
+__copyright__ = 'Copyright (c) 2015 Virtual Instruments Corporation. All rights reserved.'
+__date__ = '2026-10-18'
+__version__ = '1.0'
+
+# shared VirtualWisdom api client used by the ExportEntities, ShowTopology,
+# ExpandApplicationToInitiatorTarget and EntityImport scripts
+
+# requires python requests module by Kenneth Reitz
+# http://docs.python-requests.org/en/latest/
+# git clone git://github.com/kennethreitz/requests.git
+# pip3 install requests
+import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+import json
+import os, tempfile
+import re
+import atexit
+import threading
+import JSONStream
+from concurrent.futures import ThreadPoolExecutor
+
+jsonheaders = {'content-type': 'application/json'}
+requests.packages.urllib3.disable_warnings()
+
+# (connect, read) timeouts in seconds, large entity lists can take a while to be built by the appliance
+defaulttimeout = (10, 300)
+# read timeout in seconds of a synchronous import commit, which returns once the import is applied
+defaultcommittimeout = 3600
+defaultpoolsize = 10
+defaultretries = 3
+# the appliance returns entity lists in one response unless a smaller page size is asked for
+defaultpagesize = 500000
+# number of entity ids sent in one properties or idlist request
+defaultbatchsize = 100
+# size of the reads handed to the incremental json decoder when streaming responses
+streamchunksize = 65536
+
+# session cookies are cached here between runs, keyed by user@host, so chained tools can skip logging in
+defaultsessioncache = os.path.join(os.path.expanduser('~'), '.vwsessions')
+
+# entity types searched when looking up an entity by name
+entitytypes = ('Application', 'Host', 'HBA', 'HostPort', 'ESXCluster', 'ESXHost', 'VirtualMachine', 'StorageArray', 'StorageController', 'IOModule', 'StoragePort')
+
+class VirtualWisdomError(Exception):
+    pass
+
+# upper bounds in seconds of the request latency histogram buckets
+latencybuckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+# request counts, latencies, response sizes and status codes per endpoint, collected by a
+# response hook on the client session and written to filename when the tool exits, as a
+# prometheus textfile if filename ends in .prom and as json otherwise
+class RequestMetrics:
+    def __init__(self, filename=None):
+        self.endpoints = {}
+        self.lock = threading.Lock()
+        if filename != None:
+            atexit.register(self.Write, filename)
+
+    # ids in the path are replaced so that every application's itls count as one endpoint
+    def Endpoint(self, method, url):
+        path = requests.utils.urlparse(url).path
+        return (method, '/'.join('{id}' if re.fullmatch(r'[0-9a-fA-F-]*[0-9][0-9a-fA-F-]*', segment) else segment for segment in path.split('/')))
+
+    # response hook, latency is the time until the response headers arrived and the size of a
+    # streamed response is taken from its content-length so that the body is not read here
+    def Hook(self, r, *args, **kwargs):
+        if kwargs.get('stream'):
+            size = int(r.headers.get('content-length', 0))
+        else:
+            size = len(r.content)
+        latency = r.elapsed.total_seconds()
+        endpoint = self.Endpoint(r.request.method, r.request.url)
+        with self.lock:
+            metrics = self.endpoints.setdefault(endpoint, {'count': 0, 'seconds': 0.0, 'bytes': 0, 'status': {}, 'buckets': [0] * (len(latencybuckets) + 1)})
+            metrics['count'] += 1
+            metrics['seconds'] += latency
+            metrics['bytes'] += size
+            metrics['status'][r.status_code] = metrics['status'].get(r.status_code, 0) + 1
+            metrics['buckets'][len([bound for bound in latencybuckets if bound < latency])] += 1
+
+    def Write(self, filename):
+        with self.lock:
+            text = self.Prometheus() if filename.endswith('.prom') else self.JSON()
+        with open(filename, 'w') as fh:
+            fh.write(text)
+
+    def JSON(self):
+        endpoints = []
+        for (method, path), metrics in sorted(self.endpoints.items()):
+            buckets = dict(zip([str(bound) for bound in latencybuckets] + ['+Inf'], metrics['buckets']))
+            endpoints.append({'method': method, 'endpoint': path, 'count': metrics['count'], 'seconds': metrics['seconds'], 'bytes': metrics['bytes'], 'status': dict((str(s), n) for s, n in metrics['status'].items()), 'latency': buckets})
+        return json.dumps({'endpoints': endpoints}, indent=2)
+
+    def Prometheus(self):
+        lines = ['# HELP virtualwisdom_requests_total Requests made to the VirtualWisdom api.', '# TYPE virtualwisdom_requests_total counter']
+        for (method, path), metrics in sorted(self.endpoints.items()):
+            for status, count in sorted(metrics['status'].items()):
+                lines.append('virtualwisdom_requests_total{{method="{0}",endpoint="{1}",status="{2}"}} {3}'.format(method, path, status, count))
+        lines += ['# HELP virtualwisdom_request_duration_seconds Time until the response headers arrived.', '# TYPE virtualwisdom_request_duration_seconds histogram']
+        for (method, path), metrics in sorted(self.endpoints.items()):
+            labels = 'method="{0}",endpoint="{1}"'.format(method, path)
+            cumulative = 0
+            for bound, count in zip([str(bound) for bound in latencybuckets] + ['+Inf'], metrics['buckets']):
+                cumulative += count
+                lines.append('virtualwisdom_request_duration_seconds_bucket{{{0},le="{1}"}} {2}'.format(labels, bound, cumulative))
+            lines.append('virtualwisdom_request_duration_seconds_sum{{{0}}} {1}'.format(labels, metrics['seconds']))
+            lines.append('virtualwisdom_request_duration_seconds_count{{{0}}} {1}'.format(labels, metrics['count']))
+        lines += ['# HELP virtualwisdom_response_bytes_total Response body bytes received from the VirtualWisdom api.', '# TYPE virtualwisdom_response_bytes_total counter']
+        for (method, path), metrics in sorted(self.endpoints.items()):
+            lines.append('virtualwisdom_response_bytes_total{{method="{0}",endpoint="{1}"}} {2}'.format(method, path, metrics['bytes']))
+        return '\n'.join(lines) + '\n'
+
+class VirtualWisdomClient:
+    # with stream set, entity lists, itls and topology nodes are decoded item by item as the
+    # response arrives instead of after the whole body has been downloaded
+    # with metrics, a RequestMetrics, every response is recorded in it
+    def __init__(self, host, timeout=defaulttimeout, poolsize=defaultpoolsize, retries=defaultretries, stream=False, metrics=None, committimeout=defaultcommittimeout):
+        self.host = host
+        self.stream = stream
+        # a host given as a url, eg http://127.0.0.1:8080 for VirtualWisdomMock.py, is used as is
+        self.baseurl = host.rstrip('/') if '://' in host else 'https://{0}'.format(host)
+        self.timeout = timeout
+        self.committimeout = committimeout
+        self.session = requests.session()
+        self.session.verify = False
+        # keep-alive pool sized for the number of concurrent callers, retrying connection
+        # failures and gateway errors with backoff rather than failing the whole run, once the
+        # retries run out the last response is returned for the callers' status checks
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(502, 503, 504), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=poolsize, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        # an import commit that reached the appliance may have been applied whatever came back,
+        # so it is only retried when the connection could not be made
+        commitretry = Retry(total=retries, backoff_factor=0.5, read=0, status=0, other=0, raise_on_status=False)
+        self.session.mount(self.baseurl + '/api/config/entity/import/commit', HTTPAdapter(pool_connections=1, pool_maxsize=poolsize, max_retries=commitretry))
+        if metrics != None:
+            self.session.hooks['response'].append(metrics.Hook)
+
+    def Request(self, method, path, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, self.baseurl + path, **kwargs)
+
+    # returns the result of a json api response, or None if the call was not successful
+    def Result(self, r):
+        if r.status_code == 200:
+            body = r.json()
+            if body['status'] == "OK":
+                return body['result']
+
+    # returns the data of one page of a paged api response, a failed page raises rather than
+    # looking like a short last page that ends the list early
+    def PageData(self, method, path, r):
+        result = self.Result(r)
+        if result == None:
+            raise VirtualWisdomError("Paged request {0} {1} failed with status {2}.".format(method, path, r.json().get('status') if r.status_code == 200 else r.status_code))
+        return result['data']
+
+    # yields the items found at the itempaths of a json api response as they are decoded,
+    # see JSONStream.JSONStreamParser, with strict a failed response raises instead of ending
+    def StreamResult(self, method, path, itempaths, strict=False, **kwargs):
+        with self.Request(method, path, stream=True, **kwargs) as r:
+            if r.status_code != 200:
+                if strict:
+                    raise VirtualWisdomError("Paged request {0} {1} failed with status {2}.".format(method, path, r.status_code))
+                return
+            parser = JSONStream.JSONStreamParser(*itempaths)
+            for item in parser.Iterate(r.iter_content(chunk_size=streamchunksize)):
+                if parser.scalars.get(('status',), "OK") != "OK":
+                    break
+                yield item
+            if parser.scalars.get(('status',), "OK") != "OK" and strict:
+                raise VirtualWisdomError("Paged request {0} {1} failed with status {2}.".format(method, path, parser.scalars[('status',)]))
+
+    # walks a paged api pagesize items at a time, fetch(start, limit) returns one page and raises
+    # VirtualWisdomError if it fails, so that a failed page does not end the walk early
+    # with maxpagesize the pages double in size, up to maxpagesize, for callers that usually
+    # stop after the first few items but sometimes read them all
+    def Pages(self, fetch, pagesize, maxpagesize=None):
+        start = 0
+        while True:
+            count = 0
+            for item in fetch(start, pagesize):
+                count += 1
+                yield item
+            if count < pagesize:
+                return
+            start += pagesize
+            # a page only grows where start is a multiple of the new size, so that start and
+            # the page number sent with it name the same page
+            if maxpagesize != None and pagesize * 2 <= maxpagesize and start % (pagesize * 2) == 0:
+                pagesize *= 2
+
+    # logs into VirtualWisdom using the provided credentials on the client session
+    # if a session cache file is given, a still valid cached session is reused instead
+    # and a fresh session is written back to the cache after a full login
+    def Login(self, login, password, sessioncache=None):
+        loginpayload = {'username': login, 'password': password, 'targetRoute': None}
+        try:
+            if sessioncache != None and self.LoadSession(sessioncache, login):
+                return
+            # undocumented and unsupported apis, subject to change in every release
+            r = self.Request('POST', '/api/sec/login', data=loginpayload)
+            if r.status_code != 200:
+                raise VirtualWisdomError("Unable to connect to VirtualWisdom with provided information.")
+            if not self.CheckSession():
+                raise VirtualWisdomError("Logged into VirtualWisdom but session check was unsuccessful.")
+            if sessioncache != None:
+                self.SaveSession(sessioncache, login)
+        except VirtualWisdomError:
+            raise
+        except Exception:
+            raise VirtualWisdomError("Exception caught in the VirtualWisdom login process.")
+
+    def CheckSession(self):
+        # undocumented and unsupported apis, subject to change in every release
+        r = self.Request('GET', '/api/sec/session')
+        return r.status_code == 200 and r.json()['status'] == "OK"
+
+    def ReadSessionCache(self, sessioncache):
+        try:
+            with open(sessioncache, 'r') as fh:
+                return json.load(fh)
+        except (IOError, ValueError):
+            return {}
+
+    # restores cached cookies for this user and host, returns True if the appliance still accepts them
+    def LoadSession(self, sessioncache, login):
+        cookies = self.ReadSessionCache(sessioncache).get('{0}@{1}'.format(login, self.host))
+        if not cookies:
+            return False
+        self.session.cookies.update(cookies)
+        if self.CheckSession():
+            return True
+        self.session.cookies.clear()
+        return False
+
+    # the cache holds live session cookies, so it is only ever readable by the owner
+    def SaveSession(self, sessioncache, login):
+        cache = self.ReadSessionCache(sessioncache)
+        cache['{0}@{1}'.format(login, self.host)] = requests.utils.dict_from_cookiejar(self.session.cookies)
+        fd, tmpname = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(sessioncache)))
+        try:
+            os.chmod(tmpname, 0o600)
+            with os.fdopen(fd, 'w') as fh:
+                json.dump(cache, fh)
+            os.replace(tmpname, sessioncache)
+        except OSError:
+            # caching is only an optimisation, never fail the run because of it
+            if os.path.exists(tmpname):
+                os.remove(tmpname)
+
+    # returns a generator rather than a list when stream is set
+    # sort is an optional list of (property, 'ASC' or 'DESC') pairs
+    # with strict a failed request raises VirtualWisdomError instead of returning no entities
+    def GetEntities(self, entitytype, filter='', start=0, limit=defaultpagesize, stream=False, sort=None, strict=False):
+        # undocumented and unsupported apis, subject to change in every release
+        params = {'filter': filter, 'filterKeys': 'DisplayLabel,Tags', 'filterValues': filter, 'type': entitytype, 'page': start // limit + 1, 'start': start, 'limit': limit}
+        if sort != None:
+            params['sort'] = json.dumps([{'property': p, 'direction': d} for p, d in sort])
+        if stream:
+            return self.StreamResult('GET', '/api/entitymgmt/entities', [('result', 'data')], strict, params=params)
+        r = self.Request('GET', '/api/entitymgmt/entities', params=params)
+        if strict:
+            return self.PageData('GET', '/api/entitymgmt/entities', r)
+        result = self.Result(r)
+        return result['data'] if result != None else []
+
+    # walks the entity list pagesize entities at a time, only one page is held in memory
+    def IterEntities(self, entitytype, filter='', pagesize=defaultpagesize, sort=None, maxpagesize=None):
+        return self.Pages(lambda start, limit: self.GetEntities(entitytype, filter, start, limit, self.stream, sort, True), pagesize, maxpagesize)
+
+    # searches every entity type for the filter string, running up to workers searches at once
+    # results are concatenated in the order of entitytypes whatever order the searches complete in
+    def SearchEntities(self, filter, workers=1):
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(lambda entitytype: self.GetEntities(entitytype, filter=filter), entitytypes)
+            return [e for data in results for e in data]
+
+    def GetEntitiesByIdList(self, ids):
+        # undocumented and unsupported apis, subject to change in every release
+        result = self.Result(self.Request('POST', '/api/entitymgmt/entities/idlist', data=json.dumps(list(ids)), headers=jsonheaders))
+        return result['data'] if result != None else []
+
+    # looks up many entities by id, batchsize ids per idlist request with up to workers requests
+    # at once, duplicate ids are only asked for once, returns a dict of entity id to entity
+    def GetEntitiesById(self, ids, batchsize=defaultbatchsize, workers=1):
+        ids = list(dict.fromkeys(ids))
+        batches = [ids[i:i + batchsize] for i in range(0, len(ids), batchsize)]
+        entities = {}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for data in pool.map(self.GetEntitiesByIdList, batches):
+                for e in data:
+                    entities[e['Id']] = e
+        return entities
+
+    def GetProperties(self, ids):
+        # undocumented and unsupported apis, subject to change in every release
+        params = {'ids': ','.join(str(i) for i in ids), 'withArchived': 'false'}
+        return self.Result(self.Request('GET', '/api/entitymgmt/entity/properties', params=params))
+
+    # fetches properties for many entities, batchsize ids per request with up to workers requests
+    # at once, and returns a dict of entity id to that entity's properties
+    def GetPropertiesById(self, ids, batchsize=defaultbatchsize, workers=1):
+        ids = list(ids)
+        batches = [ids[i:i + batchsize] for i in range(0, len(ids), batchsize)]
+        properties = {}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for pairs in pool.map(self.BatchProperties, batches):
+                properties.update(pairs)
+        return properties
+
+    # returns (entity id, properties) pairs for a batch of ids, matched by the Id in each result
+    # the appliance leaves out ids it has no properties for, so results without an Id are only
+    # matched by position when none are missing, otherwise the ids are asked for one at a time
+    def BatchProperties(self, batch):
+        result = self.GetProperties(batch)
+        if result == None:
+            return []
+        if all('Id' in props for props in result):
+            return [(props['Id'], props) for props in result]
+        if len(result) == len(batch) or len(batch) == 1:
+            return [(props.get('Id', entityid), props) for entityid, props in zip(batch, result)]
+        return [pair for entityid in batch for pair in self.BatchProperties([entityid])]
+
+    # returns a generator rather than a list when stream is set
+    # with strict a failed request raises VirtualWisdomError instead of returning no itls
+    def GetApplicationITLs(self, appid, start=0, limit=defaultpagesize, stream=False, strict=False):
+        # undocumented and unsupported apis, subject to change in every release
+        params = [('filterKeys', 'initiatorLabel'), ('filterKeys', 'targetLabel'), ('page', start // limit + 1), ('start', start), ('limit', limit)]
+        path = '/api/entitymgmt/app/{0}/itls'.format(appid)
+        if stream:
+            return self.StreamResult('GET', path, [('result', 'data')], strict, params=params)
+        r = self.Request('GET', path, params=params)
+        if strict:
+            return self.PageData('GET', path, r)
+        result = self.Result(r)
+        return result['data'] if result != None else []
+
+    # walks an application's itls pagesize at a time, only one page is held in memory
+    def IterApplicationITLs(self, appid, pagesize=defaultpagesize):
+        return self.Pages(lambda start, limit: self.GetApplicationITLs(appid, start, limit, self.stream, True), pagesize)
+
+    def GetTopology(self, payload):
+        # undocumented and unsupported apis, subject to change in every release
+        return self.Result(self.Request('PUT', '/api/topo/filter4/graph', data=json.dumps(payload), headers=jsonheaders))
+
+    # returns the topology graph for the filter payload as a Topology, parsed once
+    def GetTopologyGraph(self, payload):
+        graph = Topology()
+        if self.stream:
+            # undocumented and unsupported apis, subject to change in every release
+            for itempath, item in self.StreamResult('PUT', '/api/topo/filter4/graph', [('result', 'nodes'), ('result', 'edges')], data=json.dumps(payload), headers=jsonheaders):
+                if itempath[-1] == 'nodes':
+                    graph.AddNode(item[0], item[1])
+                else:
+                    graph.AddEdge(item)
+        else:
+            result = self.GetTopology(payload)
+            if result != None:
+                for key, node in result['nodes'].items():
+                    graph.AddNode(key, node)
+                for edge in result.get('edges', []):
+                    graph.AddEdge(edge)
+        return graph
+
+    # returns the raw response, callers need the validation errors on failure
+    # data may be a generator, in which case it is sent with chunked transfer encoding
+    def ImportStart(self, data, gzip=False):
+        headers = dict(jsonheaders)
+        if gzip:
+            headers['content-encoding'] = 'gzip'
+        # undocumented and unsupported apis, subject to change in every release
+        return self.Request('POST', '/api/config/entity/import/start', data=data, headers=headers)
+
+    # with wait the commit is synchronous and only returns once the appliance has applied it,
+    # which can take longer than the read timeout for a large import, so it gets committimeout
+    def ImportCommit(self, transactionid, wait=False):
+        commitpayload = {"transactionId":transactionid,"async":"false" if wait else "true"}
+        timeout = (self.timeout[0], max(self.timeout[1], self.committimeout)) if wait else self.timeout
+        # undocumented and unsupported apis, subject to change in every release
+        return self.Request('PUT', '/api/config/entity/import/commit', data=json.dumps(commitpayload), headers=jsonheaders, timeout=timeout)
+
+# topology graph from a /api/topo/filter4/graph response, with the nodes indexed by
+# DeviceType (SERVER, STORAGE, anything else is a switch) and by their edges
+class Topology:
+    def __init__(self):
+        self.nodes = {}
+        self.bydevicetype = {}
+        self.blobs = {}
+        self.edges = []
+        self.neighbours = {}
+
+    def AddNode(self, key, node):
+        self.nodes[key] = node
+        self.bydevicetype.setdefault(node.get('DeviceType'), []).append(key)
+        # collapsed groups of ports are returned as a single node listing the member entity ids
+        if node.get('IsBlob') == True:
+            self.blobs[key] = node['ChildIds']
+
+    # edges are a list of {"source": node key, "target": node key} objects, anything else means the
+    # response is not in the shape this model was written for and is an error
+    def AddEdge(self, edge):
+        if not isinstance(edge, dict) or 'source' not in edge or 'target' not in edge:
+            raise VirtualWisdomError("Unexpected topology edge {0}, expecting source and target node keys.".format(json.dumps(edge)))
+        edge = (str(edge['source']), str(edge['target']))
+        self.edges.append(edge)
+        self.neighbours.setdefault(edge[0], []).append(edge[1])
+        self.neighbours.setdefault(edge[1], []).append(edge[0])
+
+    # returns the nodes of a DeviceType in the order the appliance returned them
+    def Nodes(self, devicetype):
+        return [self.nodes[key] for key in self.bydevicetype.get(devicetype, [])]
+
+    def Switches(self):
+        return [node for key, node in self.nodes.items() if node.get('DeviceType') not in ('SERVER', 'STORAGE')]
+
+    def IsBlob(self, node):
+        return node.get('IsBlob') == True
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+
+__author__ = 'nick.york'
+__license__ = 'https://www.apache.org/licenses/LICENSE-2.0'
+__copyright__ = 'Copyright (c) 2015 Virtual Instruments Corporation. All rights reserved.'
+__date__ = '2026-10-18'
+__version__ = '1.0'
+
+# local stand-in for the VirtualWisdom api endpoints used by the tools in this repository,
+# serving a generated estate of hosts, arrays and fabrics, for trying out and benchmarking the
+# tools without an appliance, it mimics the shape of the responses rather than the appliance's
+# behaviour in every detail
+
+# only needs the python standard library
+import sys, os, optparse
+import json
+import re
+import gzip
+import random
+import signal
+import ssl
+import threading
+import time
+import uuid
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+entitytypes = ('Application', 'Host', 'HBA', 'HostPort', 'ESXCluster', 'ESXHost', 'VirtualMachine', 'StorageArray', 'StorageController', 'IOModule', 'StoragePort')
+
+# a topology query whose unfiltered side has more ports than this on a switch returns them as
+# one collapsed blob node per switch, if the query asks for the edge switches like ShowTopology
+blobthreshold = 50
+
+class Estate:
+    def __init__(self):
+        self.entities = []
+        self.byid = {}
+        self.bytype = {}
+        self.bywwn = {}
+        self.byname = {}
+        self.children = {}
+        # per port, its logical fabric and edge switch, per fabric, its switches and ports by side
+        self.fabric = {}
+        self.switch = {}
+        self.switches = {}
+        self.ports = {}
+        # per application, its itls as the itls api returns them
+        self.itls = {}
+        self.lock = threading.Lock()
+        self.begintime = int(time.time() * 1000)
+
+    def Add(self, entitytype, name, parent=None, **properties):
+        self.begintime += 1
+        entity = {'Id': len(self.entities) + 1, 'Name': name, 'DisplayLabel': name, 'Type': entitytype, 'Tags': [], 'Description': '', 'BeginTime': self.begintime}
+        entity.update(properties)
+        self.entities.append(entity)
+        self.byid[entity['Id']] = entity
+        self.bytype.setdefault(entitytype, []).append(entity)
+        self.byname.setdefault(name, []).append(entity)
+        if 'WWN' in entity:
+            self.bywwn[entity['WWN']] = entity
+        if parent != None:
+            self.children.setdefault(parent['Id'], []).append(entity['Id'])
+        return entity
+
+    def AddPort(self, entitytype, name, wwn, parent, fabric, index):
+        port = self.Add(entitytype, name, parent, WWN=wwn)
+        switches = self.switches[fabric]
+        self.fabric[port['Id']] = fabric
+        self.switch[port['Id']] = switches[index % len(switches)]['Id']
+        self.ports.setdefault((fabric, 'SERVER' if entitytype == 'HostPort' else 'STORAGE'), []).append(port['Id'])
+        return port
+
+    # the ports below an entity, an application's are the initiators of its itls
+    def Ports(self, entityid):
+        entity = self.byid.get(entityid)
+        if entity == None:
+            return []
+        if entity['Type'] in ('HostPort', 'StoragePort'):
+            return [entityid]
+        if entity['Type'] == 'Application':
+            labels = set(itl['initiatorLabel'] for itl in self.itls.get(entityid, []))
+            return [e['Id'] for e in self.bytype.get('HostPort', []) if e['DisplayLabel'] in labels]
+        return [port for child in self.children.get(entityid, []) for port in self.Ports(child)]
+
+def WWN(prefix, number):
+    digits = '{0}{1:0{2}x}'.format(prefix, number, 16 - len(prefix))
+    return ':'.join(digits[i:i + 2] for i in range(0, 16, 2))
+
+# builds an estate of hosts with dual ported hbas and arrays with ports spread across the
+# fabrics, each fabric a chain of switches, and applications over random sets of hosts
+# seeded so that the same parameters always give the same estate
+def GenerateEstate(hosts=1000, hbas=2, arrays=20, storageports=16, fabrics=2, switches=4, applications=100, hostsperapp=5, seed=0):
+    rnd = random.Random(seed)
+    estate = Estate()
+    fabricnames = ['Fabric{0}'.format(chr(ord('A') + f)) if fabrics <= 26 else 'Fabric{0}'.format(f + 1) for f in range(fabrics)]
+    for fabric in fabricnames:
+        estate.switches[fabric] = [estate.Add('LogicalSwitch', '{0}_sw{1:02d}'.format(fabric, s + 1)) for s in range(switches)]
+    hostports = []
+    for h in range(hosts):
+        host = estate.Add('Host', 'host{0:06d}'.format(h + 1))
+        for b in range(hbas):
+            hba = estate.Add('HBA', '{0}_hba{1}'.format(host['Name'], b), host)
+            fabric = fabricnames[b % fabrics]
+            hostports.append(estate.AddPort('HostPort', hba['Name'], WWN('10000000c9', h * hbas + b), hba, fabric, h))
+    storagebyfabric = {}
+    for a in range(arrays):
+        array = estate.Add('StorageArray', 'array{0:04d}'.format(a + 1))
+        for p in range(storageports):
+            fabric = fabricnames[p % fabrics]
+            port = estate.AddPort('StoragePort', '{0}_p{1:02d}'.format(array['Name'], p), WWN('50060160', a * storageports + p), array, fabric, a * storageports + p)
+            storagebyfabric.setdefault(fabric, []).append(port)
+    for n in range(applications):
+        app = estate.Add('Application', 'app{0:05d}'.format(n + 1))
+        itls = []
+        for h in rnd.sample(range(hosts), min(hostsperapp, hosts)):
+            for port in hostports[h * hbas:(h + 1) * hbas]:
+                targets = storagebyfabric.get(estate.fabric[port['Id']], [])
+                for target in rnd.sample(targets, min(2, len(targets))):
+                    itls.append({'initiatorLabel': port['DisplayLabel'], 'targetLabel': target['DisplayLabel'], 'lun': rnd.randint(0, 255)})
+        estate.itls[app['Id']] = itls
+    return estate
+
+# answers a topology filter payload with the host and storage ports it selects, the switches
+# between them and the port to switch and switch to switch edges
+def TopologyGraph(estate, payload):
+    hostfilter = payload.get('hostFilter') or {}
+    storagefilter = payload.get('storageFilter')
+    collapse = 'hostEdgeFilter' in payload or 'storageEdgeFilter' in payload
+    sides = {}
+    for side, filter in (('SERVER', hostfilter), ('STORAGE', storagefilter)):
+        if filter != None and 'entityIds' in filter:
+            sides[side] = [port for entityid in filter['entityIds'] for port in estate.Ports(int(entityid))]
+    if str(payload.get('appId', '-1')) != '-1':
+        itls = estate.itls.get(int(payload['appId']), [])
+        labels = {'SERVER': set(itl['initiatorLabel'] for itl in itls), 'STORAGE': set(itl['targetLabel'] for itl in itls)}
+        for side in ('SERVER', 'STORAGE'):
+            candidates = sides[side] if side in sides else [port for (fabric, s), ports in estate.ports.items() if s == side for port in ports]
+            sides[side] = [port for port in candidates if estate.byid[port]['DisplayLabel'] in labels[side]]
+    # an unfiltered side is every port on the fabrics of the filtered side
+    filtered = [port for ports in sides.values() for port in ports]
+    fabrics = set(estate.fabric[port] for port in filtered) if len(filtered) > 0 else set(estate.switches.keys())
+    for side in ('SERVER', 'STORAGE'):
+        if side not in sides and (side == 'SERVER' or storagefilter != None):
+            sides[side] = [port for fabric in sorted(fabrics) for port in estate.ports.get((fabric, side), [])]
+    if storagefilter == None:
+        sides.pop('STORAGE', None)
+
+    nodes = {}
+    edges = []
+    usedswitches = set()
+    for side in ('SERVER', 'STORAGE'):
+        ports = list(dict.fromkeys(sides.get(side, [])))
+        byswitch = {}
+        for port in ports:
+            byswitch.setdefault(estate.switch[port], []).append(port)
+        for switchid, switchports in byswitch.items():
+            usedswitches.add(switchid)
+            if collapse and len(switchports) > blobthreshold:
+                key = 'blob-{0}-{1}'.format(side.lower(), switchid)
+                nodes[key] = {'Id': key, 'DisplayLabel': '{0} ports'.format(len(switchports)), 'DeviceType': side, 'IsBlob': True, 'ChildIds': switchports}
+                edges.append({'source': key, 'target': 'n{0}'.format(switchid)})
+                continue
+            for port in switchports:
+                entity = estate.byid[port]
+                nodes['n{0}'.format(port)] = {'Id': port, 'DisplayLabel': entity['DisplayLabel'], 'Name': entity['Name'], 'DeviceType': side, 'IsBlob': False}
+                edges.append({'source': 'n{0}'.format(port), 'target': 'n{0}'.format(switchid)})
+    for fabric, switches in estate.switches.items():
+        ids = [s['Id'] for s in switches]
+        if not any(switchid in usedswitches for switchid in ids):
+            continue
+        for s in switches:
+            nodes['n{0}'.format(s['Id'])] = {'Id': s['Id'], 'DisplayLabel': s['DisplayLabel'], 'Name': s['Name'], 'DeviceType': 'SWITCH', 'IsBlob': False}
+        for first, second in zip(ids, ids[1:]):
+            edges.append({'source': 'n{0}'.format(first), 'target': 'n{0}'.format(second)})
+    return {'nodes': nodes, 'edges': edges}
+
+# checks an import document well enough to report errors in the appliance's format
+def ValidateImport(document):
+    errors = []
+    if not isinstance(document, dict) or document.get('version') != 1 or not isinstance(document.get('entities'), list):
+        return [{'name': '', 'type': '', 'marker': {'message': 'Not a version 1 entity import document.', 'location': {'line': 1, 'column': 1}}}]
+    for number, entity in enumerate(document['entities']):
+        if not isinstance(entity, dict) or not entity.get('name') or not entity.get('type'):
+            errors.append({'name': entity.get('name', '') if isinstance(entity, dict) else '', 'type': entity.get('type', '') if isinstance(entity, dict) else '', 'marker': {'message': 'Entity {0} needs a name and a type.'.format(number + 1), 'location': {'line': number + 1, 'column': 1}}})
+    return errors
+
+# applies the entities of an import, fcports name the port with their wwn, applications edit
+# their itl patterns and anything else is created if need be and has its members edited
+def ApplyImport(estate, entities):
+    typenames = dict((t.lower(), t) for t in entitytypes)
+    with estate.lock:
+        for entity in entities:
+            entitytype = typenames.get(str(entity['type']).lower(), entity['type'])
+            if entitytype == 'fcport':
+                port = estate.bywwn.get(str(entity.get('wwn', '')).lower())
+                if port != None:
+                    port['DisplayLabel'] = entity['name']
+                continue
+            existing = [e for e in estate.byname.get(entity['name'], []) if e['Type'] == entitytype]
+            target = existing[0] if len(existing) > 0 else estate.Add(entitytype, entity['name'])
+            for pattern in entity.get('itl_patterns', []):
+                itl = {'initiatorLabel': Label(estate, pattern.get('initiator', '')), 'targetLabel': Label(estate, pattern.get('target', '')), 'lun': int(pattern['lun']) if pattern.get('lun') not in (None, '') else -1}
+                itls = estate.itls.setdefault(target['Id'], [])
+                if pattern.get('edit_type') == 'remove':
+                    if itl in itls:
+                        itls.remove(itl)
+                elif itl not in itls:
+                    itls.append(itl)
+            members = entity.get('child_entities', {})
+            children = estate.children.setdefault(target['Id'], [])
+            for name in members.get('add', []):
+                port = estate.bywwn.get(str(name).lower())
+                for e in estate.byname.get(name, []) + ([port] if port != None else []):
+                    if e['Id'] not in children:
+                        children.append(e['Id'])
+            for name in members.get('remove', []):
+                children[:] = [child for child in children if estate.byid[child]['Name'] != name and estate.byid[child].get('WWN') != str(name).lower()]
+
+def Label(estate, name):
+    port = estate.bywwn.get(str(name).lower())
+    return port['DisplayLabel'] if port != None else name
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    # (method, path pattern, handler), the pattern with its groups replaced by {id} names the
+    # endpoint in the request counts
+    routes = [
+        ('POST', r'/api/sec/login', 'Login'),
+        ('GET', r'/api/sec/session', 'Session'),
+        ('GET', r'/api/entitymgmt/entities', 'Entities'),
+        ('POST', r'/api/entitymgmt/entities/idlist', 'IdList'),
+        ('GET', r'/api/entitymgmt/entity/properties', 'Properties'),
+        ('GET', r'/api/entitymgmt/app/([^/]+)/itls', 'ITLs'),
+        ('PUT', r'/api/topo/filter4/graph', 'Graph'),
+        ('POST', r'/api/config/entity/import/start', 'ImportStart'),
+        ('PUT', r'/api/config/entity/import/commit', 'ImportCommit'),
+    ]
+
+    def do_GET(self):
+        self.Dispatch('GET')
+
+    def do_POST(self):
+        self.Dispatch('POST')
+
+    def do_PUT(self):
+        self.Dispatch('PUT')
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    def Dispatch(self, method):
+        url = urlsplit(self.path)
+        self.params = parse_qs(url.query)
+        for routemethod, pattern, handler in self.routes:
+            match = re.fullmatch(pattern, url.path)
+            if match != None and routemethod == method:
+                self.server.Count(method + ' ' + re.sub(r'\([^)]*\)', '{id}', pattern))
+                if self.server.latency > 0:
+                    time.sleep(self.server.latency)
+                body = self.ReadBody()
+                if handler not in ('Login', 'Session') and not self.LoggedIn():
+                    return self.Reply({'status': 'FAIL', 'result': 'Not logged in.'}, 401)
+                return getattr(self, handler)(body, *match.groups())
+        self.server.Count(method + ' unknown')
+        self.ReadBody()
+        self.Reply({'status': 'FAIL', 'result': 'Unknown api.'}, 404)
+
+    def ReadBody(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            body = b''
+            while True:
+                size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                body += self.rfile.read(size)
+                self.rfile.readline()
+        else:
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.headers.get('Content-Encoding', '').lower() == 'gzip':
+            body = gzip.decompress(body)
+        return body
+
+    def Reply(self, body, status=200, headers={}):
+        data = json.dumps(body, separators=(',', ':')).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def LoggedIn(self):
+        cookies = dict(c.strip().split('=', 1) for c in self.headers.get('Cookie', '').split(';') if '=' in c)
+        return cookies.get('JSESSIONID') in self.server.sessions
+
+    def Param(self, name, default=None):
+        return self.params[name][0] if name in self.params else default
+
+    def Page(self, items):
+        start = int(self.Param('start', 0))
+        limit = int(self.Param('limit', len(items)))
+        return {'status': 'OK', 'result': {'data': items[start:start + limit], 'total': len(items)}}
+
+    def Login(self, body):
+        form = parse_qs(body.decode('utf-8'))
+        if self.server.password != None and form.get('password', [''])[0] != self.server.password:
+            return self.Reply({'status': 'FAIL', 'result': 'Login failed.'}, 401)
+        token = uuid.uuid4().hex
+        self.server.sessions.add(token)
+        self.Reply({'status': 'OK', 'result': None}, headers={'Set-Cookie': 'JSESSIONID={0}; Path=/'.format(token)})
+
+    def Session(self, body):
+        if self.LoggedIn():
+            return self.Reply({'status': 'OK', 'result': None})
+        self.Reply({'status': 'FAIL', 'result': None}, 401)
+
+    def Entities(self, body):
+        entities = self.server.estate.bytype.get(self.Param('type'), [])
+        filter = self.Param('filter', '').lower()
+        if filter != '':
+            entities = [e for e in entities if filter in e['DisplayLabel'].lower() or any(filter in str(tag).lower() for tag in e['Tags'])]
+        for sort in reversed(json.loads(self.Param('sort', '[]'))):
+            entities = sorted(entities, key=lambda e: e.get(sort['property']), reverse=sort.get('direction', 'ASC') == 'DESC')
+        self.Reply(self.Page(entities))
+
+    def IdList(self, body):
+        estate = self.server.estate
+        self.Reply({'status': 'OK', 'result': {'data': [estate.byid[int(i)] for i in json.loads(body) if int(i) in estate.byid]}})
+
+    # properties come back in the order the ids were asked for, ports with their logical fabric
+    def Properties(self, body):
+        estate = self.server.estate
+        result = []
+        for entityid in [int(i) for i in self.Param('ids', '').split(',') if i != '']:
+            if entityid in estate.byid:
+                props = dict(estate.byid[entityid])
+                if entityid in estate.fabric:
+                    props['LogicalFabric DisplayLabel'] = estate.fabric[entityid]
+                result.append(props)
+        self.Reply({'status': 'OK', 'result': result})
+
+    def ITLs(self, body, appid):
+        self.Reply(self.Page(self.server.estate.itls.get(int(appid), [])))
+
+    def Graph(self, body):
+        self.Reply({'status': 'OK', 'result': TopologyGraph(self.server.estate, json.loads(body))})
+
+    def ImportStart(self, body):
+        try:
+            document = json.loads(body)
+            errors = ValidateImport(document)
+        except ValueError as e:
+            document = None
+            errors = [{'name': '', 'type': '', 'marker': {'message': str(e), 'location': {'line': 1, 'column': 1}}}]
+        # a forced commit of a transaction that failed validation applies its valid entities
+        transactionid = uuid.uuid4().hex
+        entities = document.get('entities') if isinstance(document, dict) else None
+        self.server.transactions[transactionid] = [e for e in entities if isinstance(e, dict) and e.get('name') and e.get('type')] if isinstance(entities, list) else []
+        if len(errors) > 0:
+            return self.Reply({'status': 'FAIL', 'result': {'transactionId': transactionid, 'entities': errors}})
+        self.Reply({'status': 'OK', 'result': {'transactionId': transactionid}})
+
+    # an async commit is applied after the reply, a synchronous one before it
+    def ImportCommit(self, body):
+        commit = json.loads(body)
+        entities = self.server.transactions.pop(commit.get('transactionId'), None)
+        if entities == None:
+            return self.Reply({'status': 'FAIL', 'result': 'Unknown transaction.'})
+        if commit.get('async') == 'false':
+            ApplyImport(self.server.estate, entities)
+        else:
+            threading.Thread(target=ApplyImport, args=(self.server.estate, entities), daemon=True).start()
+        self.Reply({'status': 'OK', 'result': None})
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, estate, latency=0, password=None, verbose=False):
+        ThreadingHTTPServer.__init__(self, address, MockHandler)
+        self.estate = estate
+        self.latency = latency
+        self.password = password
+        self.verbose = verbose
+        self.sessions = set()
+        self.transactions = {}
+        self.counts = {}
+        self.countlock = threading.Lock()
+
+    def Count(self, endpoint):
+        with self.countlock:
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+
+def ParseCmdLineParameters():
+    opts = optparse.OptionParser(description='Serve a generated estate on the VirtualWisdom api endpoints used by these tools.')
+    opts.add_option("-l", "--listen", action="store", type="string", dest="listen", default="127.0.0.1:8080")
+    opts.add_option("-d", "--latency", action="store", type="float", dest="latency", default=0)
+    opts.add_option("-p", "--password", action="store", type="string", dest="password")
+    opts.add_option("--hosts", action="store", type="int", dest="hosts", default=1000)
+    opts.add_option("--hbas", action="store", type="int", dest="hbas", default=2)
+    opts.add_option("--arrays", action="store", type="int", dest="arrays", default=20)
+    opts.add_option("--storageports", action="store", type="int", dest="storageports", default=16)
+    opts.add_option("--fabrics", action="store", type="int", dest="fabrics", default=2)
+    opts.add_option("--switches", action="store", type="int", dest="switches", default=4)
+    opts.add_option("--applications", action="store", type="int", dest="applications", default=100)
+    opts.add_option("--hostsperapp", action="store", type="int", dest="hostsperapp", default=5)
+    opts.add_option("--seed", action="store", type="int", dest="seed", default=0)
+    opts.add_option("--certfile", action="store", type="string", dest="certfile")
+    opts.add_option("--keyfile", action="store", type="string", dest="keyfile")
+    opts.add_option("--verbose", action="store_true", dest="verbose", default=False)
+    opt, argv = opts.parse_args()
+
+    if ':' not in opt.listen:
+        PrintHelpAndExit("Listen address must be host:port.")
+
+    for name in ('hbas', 'fabrics', 'switches'):
+        if getattr(opt, name) < 1:
+            PrintHelpAndExit("Number of {0} must be at least 1.".format(name))
+
+    if opt.certfile != None and not os.path.exists(opt.certfile):
+        PrintHelpAndExit("Specified certificate file does not exist.")
+
+    return opt
+
+def PrintHelpAndExit(errormessage=""):
+    if (errormessage != ""):
+        print("\n\n" + errormessage)
+    print("\n\nUsage:\n\tVirtualWisdomMock.py [-l <host:port>] [-d <Latency Seconds>] [-p <Password>] [--hosts <n>] [--hbas <n>] [--arrays <n>] [--storageports <n>] [--fabrics <n>] [--switches <n>] [--applications <n>] [--hostsperapp <n>] [--seed <n>] [--certfile <cert.pem> [--keyfile <key.pem>]]\n\n\t\tpython3 VirtualWisdomMock.py --hosts 50000 -d 0.05 &\n\t\tpython3 ExportEntities.py -v http://127.0.0.1:8080 -u admin -p admin -e all\n\n\tWithout -p any password is accepted.  Request counts per endpoint are printed when it is stopped.\n\n")
+    exit()
+
+def main():
+    options = ParseCmdLineParameters()
+
+    started = time.time()
+    estate = GenerateEstate(options.hosts, options.hbas, options.arrays, options.storageports, options.fabrics, options.switches, options.applications, options.hostsperapp, options.seed)
+    ports = sum(len(ports) for ports in estate.ports.values())
+    print("Generated {0} entities with {1} ports in {2:.1f}s.".format(len(estate.entities), ports, time.time() - started), file=sys.stderr)
+
+    host, port = options.listen.rsplit(':', 1)
+    server = MockServer((host, int(port)), estate, options.latency, options.password, options.verbose)
+    scheme = 'http'
+    if options.certfile != None:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(options.certfile, options.keyfile)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme = 'https'
+    print("Listening on {0}://{1}, pass that as -v to the tools.".format(scheme, options.listen), file=sys.stderr)
+
+    # stopping it with kill rather than ctrl-c still prints the request counts
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+    for endpoint, count in sorted(server.counts.items()):
+        print("{0:8d} {1}".format(count, endpoint), file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
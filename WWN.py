@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+__author__ = 'nick.york'
+__license__ = 'https://www.apache.org/licenses/LICENSE-2.0'
+__copyright__ = 'Copyright (c) 2015 Virtual Instruments Corporation. All rights reserved.'
+__date__ = '2026-10-18'
+__version__ = '1.0'
+
+# WWNs as 64 bit integers, whatever format they were written in, an array backed WWN to alias
+# map and a memory mapped WWN to alias index file that lookups bisect without loading it
+
+import optparse, os, sys
+import array
+import bisect
+import mmap
+import struct
+
+# index file layout, all little endian: the magic, the number of entries, the sorted WWNs as
+# 64 bit integers, count + 1 offsets of the aliases in the string table and the string table
+indexmagic = b'VWWNIDX1'
+indexheader = struct.Struct('<8sQ')
+
+# accepts 16 hex digits with or without : - or . separators, in either case
+def Parse(wwn):
+    digits = wwn.strip().replace(':', '').replace('-', '').replace('.', '')
+    if len(digits) != 16:
+        raise ValueError("{0} is not a WWN.".format(wwn))
+    return int(digits, 16)
+
+def Format(value, separator=':'):
+    digits = '{0:016x}'.format(value)
+    return separator.join(digits[i:i + 2] for i in range(0, 16, 2))
+
+def Normalize(wwn):
+    return Format(Parse(wwn))
+
+# a WWN to alias mapping held in arrays rather than a dict, the WWNs as 64 bit integers and the
+# aliases in one utf-8 string table addressed by offsets, 24 bytes plus the alias per WWN, pairs
+# are appended as they are added and sorted on the first lookup, a later pair for the same WWN wins
+class WWNMap:
+    def __init__(self, pairs=()):
+        self.values = array.array('Q')
+        self.starts = array.array('Q')
+        self.ends = array.array('Q')
+        self.strings = bytearray()
+        self.sorted = True
+        for wwn, alias in pairs:
+            self.Add(wwn, alias)
+
+    def Add(self, wwn, alias):
+        value = Parse(wwn) if isinstance(wwn, str) else wwn
+        if len(self.values) > 0 and value <= self.values[-1]:
+            self.sorted = False
+        self.values.append(value)
+        self.starts.append(len(self.strings))
+        self.strings += alias.encode('utf-8')
+        self.ends.append(len(self.strings))
+
+    # the sort is stable so the last of each run of equal WWNs is the one added last, the string
+    # table is left as it is and a replaced alias keeps its bytes until the map is dropped
+    def Sort(self):
+        if self.sorted:
+            return
+        values = array.array('Q')
+        starts = array.array('Q')
+        ends = array.array('Q')
+        order = sorted(range(len(self.values)), key=self.values.__getitem__)
+        for n, i in enumerate(order):
+            if n + 1 < len(order) and self.values[order[n + 1]] == self.values[i]:
+                continue
+            values.append(self.values[i])
+            starts.append(self.starts[i])
+            ends.append(self.ends[i])
+        self.values, self.starts, self.ends = values, starts, ends
+        self.sorted = True
+
+    def Alias(self, i):
+        return self.strings[self.starts[i]:self.ends[i]].decode('utf-8')
+
+    def __len__(self):
+        self.Sort()
+        return len(self.values)
+
+    def items(self):
+        self.Sort()
+        for i in range(len(self.values)):
+            yield (self.values[i], self.Alias(i))
+
+    def get(self, wwn, default=None):
+        self.Sort()
+        value = Parse(wwn) if isinstance(wwn, str) else wwn
+        i = bisect.bisect_left(self.values, value)
+        if i < len(self.values) and self.values[i] == value:
+            return self.Alias(i)
+        return default
+
+# writes the index file from a WWNMap or from (wwn, alias) pairs, a later pair for the same WWN
+# wins, the aliases are copied into the file's string table one at a time
+def WriteIndex(filename, pairs):
+    mapping = pairs if isinstance(pairs, WWNMap) else WWNMap(pairs)
+    mapping.Sort()
+    values = array.array('Q', mapping.values)
+    offsets = array.array('Q', [0])
+    for start, end in zip(mapping.starts, mapping.ends):
+        offsets.append(offsets[-1] + end - start)
+    if sys.byteorder != 'little':
+        values.byteswap()
+        offsets.byteswap()
+    with open(filename, 'wb') as fh:
+        fh.write(indexheader.pack(indexmagic, len(mapping)))
+        values.tofile(fh)
+        offsets.tofile(fh)
+        for start, end in zip(mapping.starts, mapping.ends):
+            fh.write(mapping.strings[start:end])
+
+# a WWN to alias index file written by WriteIndex, memory mapped so that opening it costs
+# nothing and a lookup only touches the pages it bisects through
+class WWNIndex:
+    def __init__(self, filename):
+        self.fh = open(filename, 'rb')
+        self.map = mmap.mmap(self.fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = indexheader.unpack_from(self.map, 0)
+        if magic != indexmagic:
+            raise ValueError("{0} is not a WWN index file.".format(filename))
+        start = indexheader.size
+        self.stringstart = start + 8 * (2 * self.count + 1)
+        if sys.byteorder == 'little':
+            view = memoryview(self.map)
+            self.values = view[start:start + 8 * self.count].cast('Q')
+            self.offsets = view[start + 8 * self.count:self.stringstart].cast('Q')
+        else:
+            self.values = array.array('Q', self.map[start:start + 8 * self.count])
+            self.offsets = array.array('Q', self.map[start + 8 * self.count:self.stringstart])
+            self.values.byteswap()
+            self.offsets.byteswap()
+
+    def __len__(self):
+        return self.count
+
+    def get(self, wwn, default=None):
+        value = Parse(wwn) if isinstance(wwn, str) else wwn
+        i = bisect.bisect_left(self.values, value)
+        if i < self.count and self.values[i] == value:
+            return self.map[self.stringstart + self.offsets[i]:self.stringstart + self.offsets[i + 1]].decode('utf-8')
+        return default
+
+    def items(self):
+        for i in range(self.count):
+            yield (self.values[i], self.map[self.stringstart + self.offsets[i]:self.stringstart + self.offsets[i + 1]].decode('utf-8'))
+
+    def Close(self):
+        if isinstance(self.values, memoryview):
+            self.values.release()
+            self.offsets.release()
+        self.map.close()
+        self.fh.close()
+
+def ParseCmdLineParameters():
+    opts = optparse.OptionParser(description='Look up WWNs in a WWN to alias index file.')
+    opts.add_option("-x", "--index", action="store", type="string", dest="index")
+    opt, argv = opts.parse_args()
+
+    if opt.index == None:
+        PrintHelpAndExit("You must specify the index file.")
+
+    if not os.path.exists(opt.index):
+        PrintHelpAndExit("Specified index file does not exist.")
+
+    return (opt, argv)
+
+def PrintHelpAndExit(errormessage=""):
+    if (errormessage != ""):
+        print("\n\n" + errormessage)
+    print("\n\nUsage:\n\tWWN.py -x <Index File> [<WWN> ...]\n\n\tWith no WWNs given they are read from stdin, one per line.  Index files are written by the -x option of CiscoAliasesToCSV.py and BrocadeAliShowToCSV.py.\n\n")
+    exit()
+
+def main():
+    options, wwns = ParseCmdLineParameters()
+
+    index = WWNIndex(options.index)
+    for wwn in wwns or (line.strip() for line in sys.stdin):
+        try:
+            alias = index.get(wwn)
+        except ValueError:
+            alias = None
+        print("{0},{1}".format(wwn, alias if alias != None else ''))
+    index.Close()
+
+if __name__ == '__main__':
+    main()